@@ -3,10 +3,12 @@ from .semantic_grader import SemanticGradingAgent
 from .adaptive_engine import AdaptiveMCQAgent
 from .ocr_processor import HandwritingAgent
 from .analytics import AnalyticsAgent
+from .question_pool import QuestionPool
 
 __all__ = [
     "SemanticGradingAgent",
     "AdaptiveMCQAgent", 
     "HandwritingAgent",
-    "AnalyticsAgent"
+    "AnalyticsAgent",
+    "QuestionPool"
 ]
@@ -0,0 +1,22 @@
+"""
+Grading Numeric Kernels
+Bitset loops for fallback keyword grading, compiled by Numba where available.
+"""
+import numpy as np
+
+from ._jit import njit
+
+
+@njit(cache=True)
+def fill_bits(hashes, out, mask):
+    """
+    Set one bit per token hash in a packed bitset.
+    
+    Args:
+        hashes: uint32 array of token hashes
+        out: uint8 bitset, updated in place
+        mask: Bit count minus one; selects the bit for each hash
+    """
+    for i in range(hashes.shape[0]):
+        h = hashes[i] & mask
+        out[h >> 3] |= np.uint8(1 << (h & 7))
@@ -0,0 +1,29 @@
+"""
+IRT Numeric Kernels
+Tight scalar loops over answer arrays, compiled by Numba where available.
+"""
+from ._jit import njit
+
+
+@njit(cache=True)
+def final_ability(difficulties, correct, learning_rate, initial_ability):
+    """
+    Replay the ability update rule over a whole answer sequence.
+    
+    Args:
+        difficulties: float64 array of answered question difficulties
+        correct: bool array, True where the answer was correct
+        learning_rate: Step size of each update
+        initial_ability: Ability estimate before the first answer
+        
+    Returns:
+        Final ability estimate
+    """
+    ability = initial_ability
+    for i in range(difficulties.shape[0]):
+        if correct[i]:
+            ability = ability + learning_rate * (0.5 + difficulties[i] * 0.5)
+        else:
+            ability = ability - learning_rate * (1.0 - difficulties[i] * 0.5)
+        ability = round(max(0.1, min(1.0, ability)), 3)
+    return ability
@@ -0,0 +1,14 @@
+"""
+Numba JIT shim
+Uses numba.njit when installed, otherwise runs kernels as plain Python.
+"""
+try:
+    from numba import njit
+except ImportError:  # Numba lags behind new CPython releases
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit."""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+__all__ = ["njit"]
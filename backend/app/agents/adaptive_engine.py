@@ -2,12 +2,43 @@
 Adaptive MCQ Agent
 Implements Item Response Theory (IRT) based question selection.
 """
-from typing import List, Dict, Any, Optional
-import random
+from typing import List, Dict, Optional, Collection, Tuple, Union
+from functools import lru_cache
 import logging
 
+import numpy as np
+
+from ._irt_kernels import final_ability
+from .question_pool import QuestionPool
+
 logger = logging.getLogger(__name__)
 
+
+@lru_cache(maxsize=64)
+def _difficulty_distribution(target_count: int) -> Tuple[int, int, int]:
+    """Question counts per difficulty band for a given exam size."""
+    return (
+        int(target_count * 0.3),    # 30% easy (0.0-0.3)
+        int(target_count * 0.4),    # 40% medium (0.3-0.7)
+        int(target_count * 0.3)     # 30% hard (0.7-1.0)
+    )
+
+
+@lru_cache(maxsize=1024)
+def _select_candidate(difficulties: bytes, blocked: bytes, ability: float) -> int:
+    """
+    Index of the open candidate whose difficulty is closest to the ability.
+    
+    Args:
+        difficulties: Raw float64 buffer of candidate difficulties
+        blocked: Raw bool buffer marking candidates of answered questions
+        ability: Current ability estimate
+    """
+    distances = np.abs(np.frombuffer(difficulties, dtype=np.float64) - ability)
+    distances[np.frombuffer(blocked, dtype=bool)] = np.inf
+    return int(distances.argmin())
+
+
 class AdaptiveMCQAgent:
     """
     Agent responsible for adaptive question selection.
@@ -22,59 +53,51 @@ class AdaptiveMCQAgent:
     
     def get_next_question(
         self, 
-        available_questions: List[Dict], 
+        available_questions: Union[QuestionPool, List[Dict]], 
         current_ability: float,
-        answered_question_ids: List[int] = None
+        answered_question_ids: Optional[Collection] = None
     ) -> Optional[Dict]:
         """
         Select the next question based on student's current ability level.
         Considers AI-generated adaptive variants for better granularity.
+        Accepts a prebuilt QuestionPool or the plain list of question dicts.
         """
         if not available_questions:
             return None
         
-        # Filter out already answered questions
+        pool = QuestionPool.coerce(available_questions)
+        
+        # Mask out already answered questions by position
+        answered = np.zeros(len(pool), dtype=bool)
         if answered_question_ids:
-            available_questions = [
-                q for q in available_questions 
-                if q.get('id') not in answered_question_ids
-            ]
+            answered_ids = frozenset(answered_question_ids)
+            answered = np.fromiter(
+                (qid in answered_ids for qid in pool.ids),
+                dtype=bool,
+                count=len(pool)
+            )
         
-        if not available_questions:
+        if answered.all():
             return None
         
-        # Find question (or its variant) with difficulty closest to student ability
-        best_match = None
-        min_distance = float('inf')
+        # Repeat lookups for the same pool, answers and ability hit the cache
+        idx = _select_candidate(
+            pool.candidate_difficulty.tobytes(),
+            answered[pool.candidate_base].tobytes(),
+            float(current_ability)
+        )
+        base_question = pool.questions[pool.candidate_base[idx]]
+        variant_idx = pool.candidate_variant[idx]
+        selected = base_question['adaptive_variants'][variant_idx] if variant_idx >= 0 else base_question
         
-        for base_question in available_questions:
-            # Check the base question difficulty
-            base_diff = base_question.get('difficulty', 0.5)
-            dist = abs(base_diff - current_ability)
-            
-            # Check all variants (if any)
-            variants = base_question.get('adaptive_variants', [])
-            current_best_text = base_question.get('question_text')
-            current_best_diff = base_diff
-            
-            for var in variants:
-                var_diff = var.get('difficulty', 0.5)
-                var_dist = abs(var_diff - current_ability)
-                if var_dist < dist:
-                    dist = var_dist
-                    current_best_text = var.get('question_text')
-                    current_best_diff = var_diff
-            
-            if dist < min_distance:
-                min_distance = dist
-                # Construct the selected question object
-                best_match = {
-                    **base_question,
-                    "question_text": current_best_text,
-                    "difficulty": current_best_diff
-                }
+        # Construct the selected question object
+        best_match = {
+            **base_question,
+            "question_text": selected.get('question_text'),
+            "difficulty": selected.get('difficulty', 0.5)
+        }
         
-        logger.info(f"Adaptive Select: Difficulty {best_match.get('difficulty')} (Ability: {current_ability})")
+        logger.info("Adaptive Select: Difficulty %s (Ability: %s)", best_match.get('difficulty'), current_ability)
         return best_match
     
     def update_ability(
@@ -107,7 +130,7 @@ class AdaptiveMCQAgent:
         # Clamp between 0.1 and 1.0
         new_ability = max(0.1, min(1.0, new_ability))
         
-        logger.info(f"Ability updated: {current_ability:.2f} -> {new_ability:.2f} (correct={is_correct})")
+        logger.info("Ability updated: %.2f -> %.2f (correct=%s)", current_ability, new_ability, is_correct)
         return round(new_ability, 3)
     
     def calculate_final_ability(self, answers: List[Dict]) -> float:
@@ -123,15 +146,14 @@ class AdaptiveMCQAgent:
         if not answers:
             return self.initial_ability
         
-        ability = self.initial_ability
-        for answer in answers:
-            ability = self.update_ability(
-                current_ability=ability,
-                question_difficulty=answer.get('difficulty', 0.5),
-                is_correct=answer.get('is_correct', False)
-            )
+        difficulties = np.fromiter(
+            (a.get('difficulty', 0.5) for a in answers), dtype=np.float64, count=len(answers)
+        )
+        correct = np.fromiter(
+            (bool(a.get('is_correct', False)) for a in answers), dtype=np.bool_, count=len(answers)
+        )
         
-        return ability
+        return float(final_ability(difficulties, correct, self.learning_rate, self.initial_ability))
     
     def get_difficulty_distribution(self, target_count: int = 20) -> Dict[str, int]:
         """
@@ -143,11 +165,8 @@ class AdaptiveMCQAgent:
         Returns:
             Dictionary with difficulty levels and counts
         """
-        return {
-            "easy": int(target_count * 0.3),      # 30% easy (0.0-0.3)
-            "medium": int(target_count * 0.4),    # 40% medium (0.3-0.7)
-            "hard": int(target_count * 0.3)       # 30% hard (0.7-1.0)
-        }
+        easy, medium, hard = _difficulty_distribution(target_count)
+        return {"easy": easy, "medium": medium, "hard": hard}
 
 
 # Singleton instance
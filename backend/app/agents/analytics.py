@@ -5,32 +5,67 @@ MOCKED for Python 3.14 compatibility.
 from typing import Dict, Any, List
 # import pandas as pd
 from datetime import datetime, timedelta
+from itertools import chain
 import logging
 
+import numpy as np
+
 logger = logging.getLogger(__name__)
 
 class AnalyticsAgent:
     def calculate_student_performance(self, submissions: List[Dict]) -> Dict[str, Any]:
-        if not submissions:
-            return {
-                "total_exams": 0,
-                "average_score": 0,
-                "best_score": 0,
-                "worst_score": 0,
-                "trend": "neutral"
-            }
+        return self.calculate_class_performance([submissions])[0]
+    
+    def calculate_class_performance(self, per_student_submissions: List[List[Dict]]) -> List[Dict[str, Any]]:
+        """
+        Performance summary for many students in one vectorised pass.
         
-        percentages = [s.get('percentage', 0) for s in submissions]
-        avg_score = sum(percentages) / len(percentages) if percentages else 0
+        Args:
+            per_student_submissions: Submissions grouped per student
+            
+        Returns:
+            One summary per student, in input order
+        """
+        histories = [[s.get('percentage', 0) for s in subs] for subs in per_student_submissions]
+        counts = np.fromiter(map(len, histories), dtype=np.int64, count=len(histories))
         
-        return {
-            "total_exams": len(submissions),
-            "average_score": round(avg_score, 2),
-            "best_score": max(percentages),
-            "worst_score": min(percentages),
-            "trend": "improving" if len(percentages) > 1 else "stable",
-            "scores_history": percentages
-        }
+        # Flatten every student's scores and reduce per segment; empty segments are skipped
+        # since reduceat would otherwise return the neighbouring element for them
+        scores = np.fromiter(chain.from_iterable(histories), dtype=np.float64, count=int(counts.sum()))
+        offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        non_empty = counts > 0
+        starts = offsets[non_empty]
+        
+        sums = np.zeros(len(histories))
+        maxes = np.zeros(len(histories))
+        mins = np.zeros(len(histories))
+        if starts.size:
+            sums[non_empty] = np.add.reduceat(scores, starts)
+            maxes[non_empty] = np.maximum.reduceat(scores, starts)
+            mins[non_empty] = np.minimum.reduceat(scores, starts)
+        
+        results = []
+        for i, percentages in enumerate(histories):
+            if not percentages:
+                results.append({
+                    "total_exams": 0,
+                    "average_score": 0,
+                    "best_score": 0,
+                    "worst_score": 0,
+                    "trend": "neutral"
+                })
+                continue
+            
+            results.append({
+                "total_exams": len(percentages),
+                "average_score": round(float(sums[i]) / len(percentages), 2),
+                "best_score": float(maxes[i]),
+                "worst_score": float(mins[i]),
+                "trend": "improving" if len(percentages) > 1 else "stable",
+                "scores_history": percentages
+            })
+        
+        return results
     
     def analyze_exam_performance(self, exam_data: Dict, submissions: List[Dict]) -> Dict[str, Any]:
         return {
@@ -41,7 +76,38 @@ class AnalyticsAgent:
         }
 
     def analyze_question_difficulty(self, answers: List[Dict]) -> List[Dict]:
-        return []
+        """
+        Per-question attempt count, mean score and share answered correctly.
+        
+        Args:
+            answers: Answer rows with question_id, score and is_correct
+            
+        Returns:
+            One summary per question, in order of first appearance
+        """
+        if not answers:
+            return []
+        
+        # Columns rather than rows, so every per-question aggregate is one bincount
+        question_ids, first_seen, qids = np.unique(
+            [str(a['question_id']) for a in answers], return_index=True, return_inverse=True
+        )
+        scores = np.fromiter((a.get('score', 0.0) for a in answers), dtype=np.float64, count=len(answers))
+        correct = np.fromiter((a.get('is_correct', False) for a in answers), dtype=np.float64, count=len(answers))
+        
+        counts = np.bincount(qids)
+        mean_scores = np.bincount(qids, weights=scores) / counts
+        correct_rates = np.bincount(qids, weights=correct) / counts
+        
+        return [
+            {
+                "question_id": str(question_ids[i]),
+                "attempts": int(counts[i]),
+                "average_score": round(float(mean_scores[i]), 2),
+                "correct_rate": round(float(correct_rates[i]) * 100, 2)
+            }
+            for i in np.argsort(first_seen, kind='stable').tolist()
+        ]
 
     def identify_weak_topics(self, student_answers: List[Dict]) -> List[Dict]:
         return []
@@ -0,0 +1,102 @@
+"""
+Grade Cache
+Exact and embedding-similarity cache in front of LLM grading.
+"""
+import hashlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Feedback for a grade reused from a near-identical earlier answer
+SIMILAR_FEEDBACK = "Graded the same as a near-identical earlier answer."
+
+
+class GradeCache:
+    """
+    Two-tier cache for grading results.
+    Exact repeats of an answer hit a hash lookup; when a similarity threshold is set,
+    close paraphrases of an answer already graded against the same model answer hit
+    on embedding cosine similarity.
+    """
+
+    def __init__(self, max_entries: int = 4096, per_answer_limit: int = 256, similarity: Optional[float] = None):
+        self.max_entries = max_entries
+        self.per_answer_limit = per_answer_limit
+        self.similarity = similarity
+        self._exact: "OrderedDict[bytes, Dict[str, Any]]" = OrderedDict()
+        # Model answer key -> (unit-norm embeddings, one result per row)
+        self._semantic: "OrderedDict[bytes, Tuple[np.ndarray, List[Dict[str, Any]]]]" = OrderedDict()
+
+    @staticmethod
+    def _key(*parts: Any) -> bytes:
+        return hashlib.sha256("\x00".join(map(str, parts)).encode()).digest()
+
+    def get_exact(self, student_answer: str, model_answer: str, max_points: float) -> Optional[Dict[str, Any]]:
+        """Cached result for this exact answer, or None."""
+        key = self._key(model_answer, max_points, student_answer)
+        result = self._exact.get(key)
+        if result is None:
+            return None
+        self._exact.move_to_end(key)
+        # Callers annotate results in place, so never hand out the cached dict
+        return dict(result)
+
+    def get_similar(self, embedding: np.ndarray, model_answer: str, max_points: float) -> Optional[Dict[str, Any]]:
+        """
+        Cached score of the most similar graded answer above the threshold, or None.
+        The stored feedback described that other answer, so a neutral message replaces it.
+        """
+        if self.similarity is None:
+            return None
+        key = self._key(model_answer, max_points)
+        entry = self._semantic.get(key)
+        if entry is None:
+            return None
+
+        matrix, results = entry
+        scores = matrix @ _unit(embedding)
+        best = int(scores.argmax())
+        if scores[best] < self.similarity:
+            return None
+
+        self._semantic.move_to_end(key)
+        return {**results[best], "feedback": SIMILAR_FEEDBACK}
+
+    def put(
+        self,
+        student_answer: str,
+        model_answer: str,
+        max_points: float,
+        result: Dict[str, Any],
+        embedding: Optional[np.ndarray] = None
+    ) -> None:
+        """Store a fresh grading result in both tiers."""
+        result = dict(result)
+        self._exact[self._key(model_answer, max_points, student_answer)] = result
+        if len(self._exact) > self.max_entries:
+            self._exact.popitem(last=False)
+
+        if embedding is None or self.similarity is None:
+            return
+
+        key = self._key(model_answer, max_points)
+        row = _unit(embedding)[np.newaxis, :]
+        entry = self._semantic.get(key)
+        if entry is None:
+            matrix, results = row, [result]
+        else:
+            # Oldest rows fall off once a model answer has enough cached neighbours
+            matrix = np.vstack((entry[0], row))[-self.per_answer_limit:]
+            results = (entry[1] + [result])[-self.per_answer_limit:]
+        self._semantic[key] = (matrix, results)
+        self._semantic.move_to_end(key)
+        if len(self._semantic) > self.max_entries:
+            self._semantic.popitem(last=False)
+
+
+def _unit(vector: np.ndarray) -> np.ndarray:
+    """Scale a vector to unit length so dot products are cosine similarities."""
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
@@ -0,0 +1,31 @@
+"""
+NVIDIA NIM Client
+Process-wide AsyncOpenAI client sharing one pooled HTTP/2 connection.
+"""
+from typing import Optional
+
+import httpx
+from openai import AsyncOpenAI
+
+from app.core.config import settings
+
+NIM_BASE_URL = "https://integrate.api.nvidia.com/v1"
+
+# Kept-alive connections are reused by every agent, so repeat calls skip the TCP/TLS handshake
+http_client = httpx.AsyncClient(
+    http2=True,
+    # Long completions take well over httpx's 5s default
+    timeout=httpx.Timeout(30.0),
+    limits=httpx.Limits(max_connections=64, max_keepalive_connections=32)
+)
+
+nim_client: Optional[AsyncOpenAI] = AsyncOpenAI(
+    api_key=settings.NVIDIA_API_KEY,
+    base_url=NIM_BASE_URL,
+    http_client=http_client
+) if settings.NVIDIA_API_KEY else None
+
+
+async def close_nim_client():
+    """Close the shared connection pool on application shutdown."""
+    await http_client.aclose()
@@ -1,21 +1,110 @@
+import asyncio
 import json
 import logging
-from typing import List, Dict, Any, Optional
-from openai import OpenAI
+import re
+from typing import List, Dict, Any, Optional, AsyncIterator
+import orjson
 from app.core.config import settings
+from .nim_client import NIM_BASE_URL, nim_client
 
 logger = logging.getLogger(__name__)
 
+# Settings read once at import rather than on every agent construction or generation
+_API_KEY = settings.NVIDIA_API_KEY
+_MODEL = settings.NVIDIA_LLM_MODEL
+_MAX_CONCURRENCY = settings.NVIDIA_MAX_CONCURRENCY
+
+# Study material sent with the exam prompt, and the excerpt budget for variant prompts
+MATERIAL_LIMIT = 50000
+EXCERPT_LIMIT = 5000
+
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+")
+# JSON payload inside an optional ```json markdown fence
+_FENCE_RE = re.compile(r"```(?:json)?\s*(\[.*\]|\{.*\})\s*```", re.DOTALL)
+
+
+def _strip_fence(content: str) -> str:
+    """Return the JSON inside a markdown code fence, or the stripped content if unfenced."""
+    match = _FENCE_RE.search(content)
+    return match.group(1) if match else content.strip()
+
+
+def _material_excerpt(material: str, concept_tags: List[str]) -> str:
+    """Collect the sentences of the material that mention any of the concept tags."""
+    tags = [re.escape(tag) for tag in concept_tags if tag]
+    if not tags:
+        return ""
+    
+    tag_re = re.compile(r"\b(?:" + "|".join(tags) + r")\b", re.IGNORECASE)
+    excerpt = " ".join(
+        sentence for sentence in _SENTENCE_SPLIT_RE.split(material) if tag_re.search(sentence)
+    )
+    return excerpt[:EXCERPT_LIMIT]
+
+class _ObjectStreamParser:
+    """
+    Incrementally extracts top-level JSON objects from streamed text.
+    Anything outside an object (markdown fences, array brackets, commas) is skipped.
+    """
+    
+    def __init__(self):
+        self._buffer: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._array_opened = False
+        self._array_closed = False
+    
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """Consume a chunk of text and return the objects it completed."""
+        objects = []
+        for ch in text:
+            if self._depth == 0:
+                if ch == "[":
+                    self._array_opened = True
+                elif ch == "]" and self._array_opened:
+                    self._array_closed = True
+                if ch != "{":
+                    continue
+                self._buffer = []
+            
+            self._buffer.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    objects.append(orjson.loads("".join(self._buffer)))
+        return objects
+    
+    def partial(self) -> str:
+        """Text of the object currently being parsed."""
+        return "".join(self._buffer)
+    
+    def finished(self) -> bool:
+        """True once the top-level array has closed with no object left half-parsed."""
+        return self._depth == 0 and self._array_closed
+
+
 class NVIDIAExamGenerator:
     """
     Agent responsible for generating exam questions using NVIDIA NIM APIs.
     """
     
     def __init__(self):
-        self.api_key = settings.NVIDIA_API_KEY
-        self.base_url = "https://integrate.api.nvidia.com/v1"
-        self.client = OpenAI(api_key=self.api_key, base_url=self.base_url) if self.api_key else None
-        self.model = settings.NVIDIA_LLM_MODEL
+        self.api_key = _API_KEY
+        self.base_url = NIM_BASE_URL
+        self.client = nim_client
+        self.model = _MODEL
 
     def is_configured(self) -> bool:
         return self.client is not None
@@ -37,12 +126,13 @@ class NVIDIAExamGenerator:
             return self._mock_generate(num_questions)
 
         instruction_block = f"\n        ADDITIONAL INSTRUCTIONS:\n        {instructions}\n" if instructions else ""
+        material = study_material[:MATERIAL_LIMIT]
 
         prompt = f"""
         You are an expert academic examiner. Based ONLY on the provided study material, generate an exam titled '{exam_title}'.
         {instruction_block}
         STUDY MATERIAL:
-        {study_material[:50000]} # Analyzes up to 50k characters for comprehensive coverage
+        {material} # Analyzes up to 50k characters for comprehensive coverage
         
         REQUIREMENTS:
         - Total Number of Questions: {num_questions}
@@ -86,59 +176,87 @@ class NVIDIAExamGenerator:
         """
 
         try:
-            logger.info(f"Sending {len(study_material)} chars to NVIDIA NIM for analysis...")
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a professional assessment generator who outputs strict JSON."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.2,
-                top_p=0.7,
-                max_tokens=4000
-            )
+            logger.info("Sending %d chars to NVIDIA NIM for analysis...", len(study_material))
             
-            content = response.choices[0].message.content
-            # Strip markdown code blocks if present
-            if "```json" in content:
-                content = content.split("```json")[1].split("```")[0].strip()
-            elif "```" in content:
-                content = content.split("```")[1].split("```")[0].strip()
-            
-            try:
-                questions = json.loads(content)
-            except json.JSONDecodeError as je:
-                logger.error(f"NVIDIA API returned invalid JSON: {content}")
-                raise ValueError(f"AI response was not valid JSON. Please try again or simplify the material.")
+            # Generate adaptive variants for each question in parallel, capped to avoid NIM rate limits
+            semaphore = asyncio.Semaphore(_MAX_CONCURRENCY)
             
-            import asyncio
-            
-            logger.info(f"Generating parallel adaptive variants for {len(questions)} questions...")
-            
-            # Generate adaptive variants for each question in parallel
             async def attach_variants(q):
-                q['adaptive_variants'] = await self.generate_adaptive_variants(q, study_material)
+                async with semaphore:
+                    q['adaptive_variants'] = await self.generate_adaptive_variants(q, material)
                 return q
 
-            questions = await asyncio.gather(*(attach_variants(q) for q in questions))
+            # Start each question's variants as soon as it is streamed, overlapping with generation
+            variant_tasks = []
+            try:
+                async for question in self._stream_questions(prompt):
+                    variant_tasks.append(asyncio.create_task(attach_variants(question)))
+            except BaseException:
+                for task in variant_tasks:
+                    task.cancel()
+                raise
+            
+            if not variant_tasks:
+                raise ValueError("AI response did not contain any questions. Please try again or simplify the material.")
+            
+            logger.info("Waiting on parallel adaptive variants for %d questions...", len(variant_tasks))
+            questions = await asyncio.gather(*variant_tasks)
             
             logger.info("NVIDIA Generation complete!")
             return questions
 
         except Exception as e:
-            logger.error(f"NVIDIA logic error: {str(e)}")
+            logger.error("NVIDIA logic error: %s", e)
             # For preview/orchestration, we want to know what failed
             raise e
 
+    async def _stream_questions(self, prompt: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream the exam completion and yield each question object as soon as it is complete.
+        """
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": "You are a professional assessment generator who outputs strict JSON."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.2,
+            top_p=0.7,
+            max_tokens=4000,
+            stream=True
+        )
+        
+        parser = _ObjectStreamParser()
+        async for chunk in response:
+            if not chunk.choices or not chunk.choices[0].delta.content:
+                continue
+            try:
+                questions = parser.feed(chunk.choices[0].delta.content)
+            except orjson.JSONDecodeError:
+                logger.error("NVIDIA API returned invalid JSON: %s", parser.partial())
+                raise ValueError("AI response was not valid JSON. Please try again or simplify the material.")
+            for question in questions:
+                yield question
+        
+        # A truncated completion (e.g. one that hit max_tokens) ends mid-object or mid-array
+        if not parser.finished():
+            logger.error("NVIDIA API returned incomplete JSON: %s", parser.partial())
+            raise ValueError("AI response was not valid JSON. Please try again or simplify the material.")
+
     async def generate_adaptive_variants(self, original_question: Dict[str, Any], material: str) -> List[Dict[str, Any]]:
         """
         Generates easier and harder variants of a question for adaptive testing.
+        Only the sentences of the material that mention the question's concepts are sent.
         """
+        concept_tags = original_question.get('concept_tags', [])
+        excerpt = _material_excerpt(material, concept_tags)
+        excerpt_block = f"\n        STUDY MATERIAL EXCERPT:\n        {excerpt}\n" if excerpt else ""
+        
         prompt = f"""
         Original Question: {original_question['question_text']}
         Difficulty: {original_question['difficulty']}
-        Concepts: {", ".join(original_question.get('concept_tags', []))}
-        
+        Concepts: {", ".join(concept_tags)}
+        {excerpt_block}
         Based on the study material, generate 2 variants:
         1. An EASIER version (difficulty around 0.2)
         2. A HARDER version (difficulty around 0.8)
@@ -148,16 +266,14 @@ class NVIDIAExamGenerator:
         
         try:
             # We use a smaller token limit for variants
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model=self.model,
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.3,
                 max_tokens=1000
             )
             content = response.choices[0].message.content
-            if "```json" in content:
-                content = content.split("```json")[1].split("```")[0].strip()
-            return json.loads(content)
+            return orjson.loads(_strip_fence(content))
         except:
             return []
 
@@ -2,17 +2,28 @@
 Exam Orchestrator Agent
 Central controller for exam flow, delegating to specialized agents.
 """
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Union
 from datetime import datetime
+from bisect import bisect_right
 import logging
 
+import numpy as np
+
 from .semantic_grader import grading_agent
 from .adaptive_engine import adaptive_agent
 from .ocr_processor import ocr_agent
 from .analytics import analytics_agent
+from .question_pool import QuestionPool, answer_code
 
 logger = logging.getLogger(__name__)
 
+# Grade policy: lower bound (inclusive) of each band above F
+GRADE_THRESHOLDS = (50, 60, 70, 80, 90)
+GRADES = ("F", "D", "C", "B", "A", "A+")
+
+# Uploads smaller than this cannot hold a legible image and are not sent to OCR
+MIN_IMAGE_BYTES = 100
+
 class ExamOrchestrator:
     """
     The main orchestrator that coordinates all agents during an exam.
@@ -24,12 +35,17 @@ class ExamOrchestrator:
         self.adaptive = adaptive_agent
         self.ocr = ocr_agent
         self.analytics = analytics_agent
+        # Grader per question type; unknown types are graded as descriptive
+        self._graders = {
+            'mcq': self._grade_mcq,
+            'descriptive': self._grade_descriptive
+        }
     
     async def start_exam_session(
         self, 
         student_id: int, 
         exam_id: int,
-        questions: List[Dict],
+        questions: Union[QuestionPool, List[Dict]],
         is_adaptive: bool = True
     ) -> Dict[str, Any]:
         """
@@ -40,24 +56,24 @@ class ExamOrchestrator:
         """
         # Initial ability estimate
         initial_ability = 0.5
+        pool = QuestionPool.coerce(questions)
         
         if is_adaptive:
             # Get first question based on medium difficulty
             first_question = self.adaptive.get_next_question(
-                available_questions=questions,
+                available_questions=pool,
                 current_ability=initial_ability,
                 answered_question_ids=[]
             )
         else:
-            # Get first question in the list (sequential)
-            sorted_qs = sorted(questions, key=lambda x: x.get('id', 0))
-            first_question = sorted_qs[0] if sorted_qs else None
+            # Get first question in id order (sequential); one pass, no full sort
+            first_question = min(pool.questions, key=lambda x: x.get('id', 0), default=None)
         
         return {
             "session_started": True,
             "current_ability": initial_ability,
             "first_question": first_question,
-            "total_questions": len(questions)
+            "total_questions": len(pool)
         }
     
     async def process_answer(
@@ -81,14 +97,15 @@ class ExamOrchestrator:
         extracted_text = None
         
         # Handle handwritten submission
-        if image_bytes:
+        if image_bytes and len(image_bytes) >= MIN_IMAGE_BYTES:
             logger.info("Processing handwritten answer via OCR...")
             ocr_result = self.ocr.extract_text(image_bytes)
             
             if ocr_result['success']:
                 extracted_text = ocr_result['text']
                 student_answer = extracted_text
-                logger.info(f"OCR extracted: {extracted_text[:100]}...")
+                # %.100s truncates lazily, only when INFO is enabled
+                logger.info("OCR extracted: %.100s...", extracted_text)
             else:
                 return {
                     "success": False,
@@ -98,10 +115,8 @@ class ExamOrchestrator:
                 }
         
         # Grade based on question type
-        if question_type == 'mcq':
-            result = self._grade_mcq(question, student_answer)
-        else:
-            result = self._grade_descriptive(question, student_answer)
+        grader = self._graders.get(question_type, self._grade_descriptive)
+        result = await grader(question, student_answer)
         
         # Add OCR info if applicable
         if extracted_text:
@@ -109,12 +124,18 @@ class ExamOrchestrator:
         
         return result
     
-    def _grade_mcq(self, question: Dict, student_answer: str) -> Dict[str, Any]:
+    async def _grade_mcq(self, question: Dict, student_answer: str) -> Dict[str, Any]:
         """Grade an MCQ answer."""
-        correct_answer = question.get('correct_answer', '').strip().upper()
-        student_answer = student_answer.strip().upper()
+        raw_correct = question.get('correct_answer') or ''
+        correct_code = answer_code(raw_correct)
         
-        is_correct = student_answer == correct_answer
+        if correct_code:
+            # Single-letter keys (the common case) compare as character codes
+            correct_answer = chr(correct_code)
+            is_correct = answer_code(student_answer) == correct_code
+        else:
+            correct_answer = raw_correct.strip().upper()
+            is_correct = student_answer.strip().upper() == correct_answer
         points = question.get('points', 1.0)
         
         return {
@@ -125,12 +146,23 @@ class ExamOrchestrator:
             "feedback": "Correct!" if is_correct else f"Incorrect. The correct answer was {correct_answer}."
         }
     
-    def _grade_descriptive(self, question: Dict, student_answer: str) -> Dict[str, Any]:
+    async def _grade_descriptive(self, question: Dict, student_answer: str) -> Dict[str, Any]:
         """Grade a descriptive answer using semantic similarity."""
         model_answer = question.get('model_answer', '')
         points = question.get('points', 1.0)
         
-        result = self.grader.grade_answer(
+        # Blank answers score zero without a grader round trip
+        if not student_answer or not student_answer.strip():
+            return {
+                "success": True,
+                "is_correct": False,
+                "score": 0.0,
+                "percentage": 0,
+                "feedback": "No answer provided.",
+                "grade": "F"
+            }
+        
+        result = await self.grader.grade_answer(
             student_answer=student_answer,
             model_answer=model_answer,
             max_points=points
@@ -143,7 +175,7 @@ class ExamOrchestrator:
     
     async def get_next_question(
         self,
-        questions: List[Dict],
+        questions: Union[QuestionPool, List[Dict]],
         current_ability: float,
         answered_ids: List[int],
         last_answer_correct: bool,
@@ -166,7 +198,7 @@ class ExamOrchestrator:
         next_question = self.adaptive.get_next_question(
             available_questions=questions,
             current_ability=new_ability,
-            answered_question_ids=answered_ids
+            answered_question_ids=frozenset(answered_ids)
         )
         
         if next_question is None:
@@ -193,11 +225,16 @@ class ExamOrchestrator:
         Returns:
             Final results and analytics
         """
-        total_score = sum(a.get('score', 0) for a in answers)
-        max_score = sum(a.get('max_points', 1) for a in answers)
+        n = len(answers)
+        scores = np.fromiter((a.get('score', 0) for a in answers), dtype=np.float64, count=n)
+        max_points = np.fromiter((a.get('max_points', 1) for a in answers), dtype=np.float64, count=n)
+        correct = np.fromiter((bool(a.get('is_correct')) for a in answers), dtype=np.bool_, count=n)
+        
+        total_score = float(scores.sum())
+        max_score = float(max_points.sum())
         percentage = (total_score / max_score * 100) if max_score > 0 else 0
         
-        correct_count = sum(1 for a in answers if a.get('is_correct'))
+        correct_count = int(correct.sum())
         
         # Generate analytics
         performance = self.analytics.calculate_student_performance([{
@@ -217,18 +254,7 @@ class ExamOrchestrator:
     
     def _calculate_grade(self, percentage: float) -> str:
         """Convert percentage to letter grade."""
-        if percentage >= 90:
-            return "A+"
-        elif percentage >= 80:
-            return "A"
-        elif percentage >= 70:
-            return "B"
-        elif percentage >= 60:
-            return "C"
-        elif percentage >= 50:
-            return "D"
-        else:
-            return "F"
+        return GRADES[bisect_right(GRADE_THRESHOLDS, percentage)]
 
 
 # Singleton instance
@@ -0,0 +1,105 @@
+"""
+Question Pool
+Structure-of-arrays view over an exam's question dicts for the adaptive hot paths.
+"""
+from dataclasses import dataclass
+from functools import cached_property
+from typing import List, Dict, Union, Optional
+
+import numpy as np
+
+
+def answer_code(answer: Optional[str]) -> int:
+    """
+    Character code of a single-letter answer, upper-cased; 0 if the answer is not one ASCII character.
+    Single-character inputs are handled without allocating new strings.
+    """
+    if not answer:
+        return 0
+    if len(answer) != 1:
+        answer = answer.strip()
+        if len(answer) != 1:
+            return 0
+    code = ord(answer)
+    if code >= 128:
+        return 0
+    return code - 32 if 97 <= code <= 122 else code
+
+
+@dataclass
+class QuestionPool:
+    """
+    Parallel NumPy arrays built once from a list of question dicts.
+    The original dicts are kept so selected questions can be returned unchanged.
+    """
+    questions: List[Dict]
+    ids: np.ndarray                  # object: question ids as given
+    difficulty: np.ndarray           # float64
+    points: np.ndarray               # float64
+    correct_answer: np.ndarray       # object: MCQ answer key (None for descriptive)
+    correct_answer_code: np.ndarray  # uint8: answer_code() of the key, 0 when not a single letter
+    # Base questions followed by their adaptive variants, flattened
+    candidate_difficulty: np.ndarray  # float64
+    candidate_base: np.ndarray        # int32 index into questions
+    candidate_variant: np.ndarray     # int32 index into adaptive_variants, -1 for the base question
+
+    @classmethod
+    def from_dicts(cls, questions: List[Dict]) -> "QuestionPool":
+        """Build the pool from question dicts as produced by the API layer."""
+        # Single pass over the dicts; method lookups are hoisted out of the loop
+        get = dict.get
+        ids, difficulty, points, correct_answer = [], [], [], []
+        candidate_difficulty, candidate_base, candidate_variant = [], [], []
+        add_candidate = candidate_difficulty.append
+        add_base = candidate_base.append
+        add_variant = candidate_variant.append
+        
+        for i, question in enumerate(questions):
+            base_difficulty = get(question, 'difficulty', 0.5)
+            ids.append(get(question, 'id'))
+            difficulty.append(base_difficulty)
+            points.append(get(question, 'points', 1.0))
+            correct_answer.append(get(question, 'correct_answer'))
+            
+            add_candidate(base_difficulty)
+            add_base(i)
+            add_variant(-1)
+            for j, var in enumerate(get(question, 'adaptive_variants', [])):
+                add_candidate(get(var, 'difficulty', 0.5))
+                add_base(i)
+                add_variant(j)
+
+        ids_array = np.empty(len(ids), dtype=object)
+        ids_array[:] = ids
+        correct_answer_array = np.empty(len(correct_answer), dtype=object)
+        correct_answer_array[:] = correct_answer
+
+        return cls(
+            questions=questions,
+            ids=ids_array,
+            difficulty=np.asarray(difficulty, dtype=np.float64),
+            points=np.asarray(points, dtype=np.float64),
+            correct_answer=correct_answer_array,
+            correct_answer_code=np.fromiter(map(answer_code, correct_answer), dtype=np.uint8, count=len(correct_answer)),
+            candidate_difficulty=np.asarray(candidate_difficulty, dtype=np.float64),
+            candidate_base=np.asarray(candidate_base, dtype=np.int32),
+            candidate_variant=np.asarray(candidate_variant, dtype=np.int32)
+        )
+
+    @classmethod
+    def coerce(cls, questions: Union["QuestionPool", List[Dict]]) -> "QuestionPool":
+        """Accept either a ready pool or the plain dict list used at route boundaries."""
+        return questions if isinstance(questions, cls) else cls.from_dicts(questions)
+
+    @cached_property
+    def difficulty_order(self) -> np.ndarray:
+        """Question indices by ascending difficulty; stable, so equal difficulties keep pool order."""
+        return np.argsort(self.difficulty, kind="stable")
+
+    @cached_property
+    def sorted_difficulty(self) -> np.ndarray:
+        """Difficulties in difficulty_order, for bisecting to the nearest question."""
+        return self.difficulty[self.difficulty_order]
+
+    def __len__(self) -> int:
+        return len(self.questions)
@@ -1,10 +1,27 @@
 import logging
-import requests
-from typing import Optional
+import time
+from typing import AsyncIterator, Optional, Union
+
+import httpx
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+_RIVA_URL = settings.RIVA_URL
+
+# Seconds a Riva health probe result is trusted before probing again
+HEALTH_TTL = 60.0
+
+# Audio is relayed to and from Riva in chunks of this size
+AUDIO_CHUNK_SIZE = 64 * 1024
+
+# Kept-alive connection to the Riva HTTP bridge, shared by all requests
+_client = httpx.AsyncClient(
+    base_url=_RIVA_URL,
+    limits=httpx.Limits(max_keepalive_connections=8),
+    timeout=10.0
+)
+
 class RivaAccessibilityAgent:
     """
     Agent for NVIDIA Riva integration: STT and TTS.
@@ -13,35 +30,86 @@ class RivaAccessibilityAgent:
     """
     
     def __init__(self):
-        self.riva_url = settings.RIVA_URL
+        self.riva_url = _RIVA_URL
         self.enabled = False # Initialize as false until checked
+        self._checked_at = float("-inf")
 
-    async def text_to_speech(self, text: str) -> Optional[bytes]:
-        """Convert text to speech audio bytes using NVIDIA Riva."""
+    async def _is_available(self) -> bool:
+        """Probe Riva's health endpoint, caching the answer for HEALTH_TTL seconds."""
+        now = time.monotonic()
+        if now - self._checked_at < HEALTH_TTL:
+            return self.enabled
+        
+        try:
+            response = await _client.get("/health")
+            self.enabled = response.is_success
+        except httpx.HTTPError:
+            self.enabled = False
+        self._checked_at = now
+        return self.enabled
+
+    async def text_to_speech(self, text: str) -> Optional[AsyncIterator[bytes]]:
+        """
+        Convert text to speech using NVIDIA Riva, streaming the audio.
+        
+        Returns:
+            Audio chunks as Riva produces them, or None when TTS is unavailable
+        """
         if not text:
             return None
             
-        logger.info(f"Riva TTS: Converting '{text[:30]}...'")
+        logger.info("Riva TTS: Converting '%.30s...'", text)
+        
+        # Returning None lets the client fall back to browser TTS while Riva is offline
+        if not await self._is_available():
+            return None
         
         try:
-            # Placeholder for Riva gRPC/HTTP call
-            # In actual Riva deployment, you'd call the TTS service
-            # For now, we return None to fall back to browser TTS if Riva is offline
+            request = _client.build_request("POST", "/v1/tts", json={"text": text})
+            response = await _client.send(request, stream=True)
+        except httpx.HTTPError as e:
+            logger.error("Riva TTS Error: %s", e)
             return None
-        except Exception as e:
-            logger.error(f"Riva TTS Error: {e}")
+        if not response.is_success:
+            logger.error("Riva TTS Error: HTTP %s", response.status_code)
+            await response.aclose()
             return None
+        return _iter_audio(response)
 
-    async def speech_to_text(self, audio_data: bytes) -> str:
-        """Convert speech audio to text using NVIDIA Riva."""
+    async def speech_to_text(self, audio_data: Union[bytes, AsyncIterator[bytes]]) -> str:
+        """Convert speech audio (bytes, or an async iterator of chunks) to text using NVIDIA Riva."""
         if not audio_data:
             return ""
+        
+        if not await self._is_available():
+            # Mock transcription while Riva is offline
+            return "Sample recognized text from Riva"
             
         try:
-            # Placeholder for Riva STT service call
-            return "Sample recognized text from Riva"
+            response = await _client.post(
+                "/v1/asr",
+                content=audio_data,
+                headers={"Content-Type": "application/octet-stream"}
+            )
+            response.raise_for_status()
+            return response.json().get("text", "")
         except Exception as e:
-            logger.error(f"Riva STT Error: {e}")
+            logger.error("Riva STT Error: %s", e)
             return ""
 
+
+async def _iter_audio(response: httpx.Response) -> AsyncIterator[bytes]:
+    """Relay a streamed Riva response chunk by chunk, closing it when done."""
+    try:
+        async for chunk in response.aiter_bytes(AUDIO_CHUNK_SIZE):
+            yield chunk
+    finally:
+        await response.aclose()
+
+
+async def close_riva_client():
+    """Close the shared Riva connection on application shutdown."""
+    await _client.aclose()
+
+# Singleton instance
 riva_agent = RivaAccessibilityAgent()
@@ -1,11 +1,155 @@
+import asyncio
 import logging
 import json
-from typing import Dict, Any
-from openai import OpenAI
+import re
+import zlib
+from bisect import bisect_left
+from typing import Dict, Any, List, Optional
+
+import numpy as np
 from app.core.config import settings
+from ._grading_kernels import fill_bits
+from .grade_cache import GradeCache
+from .nim_client import NIM_BASE_URL, nim_client
 
 logger = logging.getLogger(__name__)
 
+# Settings read once at import rather than on every agent construction or batch
+_API_KEY = settings.NVIDIA_API_KEY
+_MODEL = settings.NVIDIA_LLM_MODEL
+_EMBED_MODEL = settings.NVIDIA_EMBED_MODEL
+_MAX_CONCURRENCY = settings.NVIDIA_MAX_CONCURRENCY
+_CACHE_SIZE = settings.GRADE_CACHE_SIZE
+_CACHE_SIMILARITY = settings.GRADE_CACHE_SIMILARITY
+
+# Fallback grading packs words into fixed-size bitsets so overlap is a popcount
+_BITS = 4096
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+_TOKEN_RE = re.compile(r"\w+")
+_STOP_WORDS = frozenset({
+    "a", "an", "the", "is", "are", "was", "were", "be", "been", "of", "to", "in",
+    "on", "at", "for", "by", "with", "and", "or", "it", "this", "that", "as", "from"
+})
+
+
+def _token_hashes(text: str) -> np.ndarray:
+    """Stable uint32 hashes of the lower-cased keywords of a text."""
+    words = [word for word in _TOKEN_RE.findall(text.lower()) if word not in _STOP_WORDS]
+    # crc32 is stable across processes, unlike the salted built-in hash()
+    return np.fromiter(
+        (zlib.crc32(word.encode()) for word in words),
+        dtype=np.uint32,
+        count=len(words)
+    )
+
+
+def _word_bits(text: str) -> np.ndarray:
+    """Hash the lower-cased keywords of a text into a packed bitset."""
+    bits = np.zeros(_BITS // 8, dtype=np.uint8)
+    fill_bits(_token_hashes(text), bits, np.uint32(_BITS - 1))
+    return bits
+
+
+def _popcount(bits: np.ndarray) -> int:
+    """Number of set bits in a packed bitset."""
+    return int(_POPCOUNT[bits].sum())
+
+
+def _is_verbatim(student_answer: str, model_answer: Optional[str]) -> bool:
+    """True when the answer is the model answer up to case and surrounding whitespace."""
+    return student_answer.strip().lower() == (model_answer or '').strip().lower()
+
+
+def _verbatim_result(max_points: float) -> Dict[str, Any]:
+    """Full marks for a verbatim model answer, without any grading work."""
+    return {
+        "score": float(max_points),
+        "percentage": 100,
+        "feedback": "Answer matches the model answer.",
+        "grade": "A+"
+    }
+
+
+def _normalise_reply(reply: Dict[str, Any], max_points: float) -> Dict[str, Any]:
+    """
+    Coerce an LLM grading reply into the result shape callers index into.
+    Raises KeyError/TypeError/ValueError for replies without a usable percentage.
+    """
+    percentage = max(0, min(100, int(float(reply["percentage"]))))
+    score = reply.get("score")
+    score = float(score) if score is not None else round(percentage / 100 * max_points, 2)
+    return {
+        "score": max(0.0, min(score, float(max_points))),
+        "percentage": percentage,
+        "feedback": str(reply.get("feedback", "")),
+        "grade": str(reply.get("grade", ""))
+    }
+
+
+# Output budget for one grading reply; the terse JSON reply fits well inside it
+GRADE_MAX_TOKENS = 120
+
+# Fallback grade bands: ratios above each threshold move up one grade
+_FALLBACK_THRESHOLDS = (0.4,)
+_FALLBACK_GRADES = ("F", "C")
+
+
+class MockOverlapGrader:
+    """
+    Keyword-recall grader used without NIM access or when a NIM call fails.
+    Scores the share of model-answer keywords that appear in the student answer.
+    """
+    
+    def grade(self, student_answer: str, model_answer: str, max_points: float) -> Dict[str, Any]:
+        """Simple keyword-based fallback grading."""
+        model_bits = _word_bits(model_answer)
+        model_count = _popcount(model_bits)
+        overlap = _popcount(_word_bits(student_answer) & model_bits)
+        ratio = overlap / model_count if model_count else 0
+        
+        percentage = int(ratio * 100)
+        score = round(ratio * max_points, 2)
+        
+        return {
+            "score": score,
+            "percentage": percentage,
+            "feedback": "Graded via fallback keyword matching.",
+            "grade": _FALLBACK_GRADES[bisect_left(_FALLBACK_THRESHOLDS, ratio)]
+        }
+
+    def grade_batch(self, answers: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Fallback grading for a batch with one vectorised overlap pass."""
+        if not answers:
+            return []
+        
+        # One bitset row per answer, so overlap for the whole batch is a single AND + popcount
+        student_bits = np.stack([_word_bits(a.get('student_answer') or '') for a in answers])
+        model_bits = np.stack([_word_bits(a.get('model_answer') or '') for a in answers])
+        model_counts = _POPCOUNT[model_bits].sum(axis=1, dtype=np.int64)
+        overlaps = _POPCOUNT[student_bits & model_bits].sum(axis=1, dtype=np.int64)
+        ratios = np.divide(overlaps, model_counts, out=np.zeros(len(answers)), where=model_counts > 0)
+        grade_idx = np.searchsorted(_FALLBACK_THRESHOLDS, ratios, side='left')
+        
+        results = []
+        for a, ratio, g in zip(answers, ratios.tolist(), grade_idx.tolist()):
+            student_answer = a.get('student_answer')
+            if not student_answer or not student_answer.strip():
+                results.append({"score": 0.0, "percentage": 0, "feedback": "No answer provided.", "grade": "F"})
+                continue
+            if _is_verbatim(student_answer, a.get('model_answer')):
+                results.append(_verbatim_result(a.get('max_points', 1.0)))
+                continue
+            results.append({
+                "score": round(ratio * a.get('max_points', 1.0), 2),
+                "percentage": int(ratio * 100),
+                "feedback": "Graded via fallback keyword matching.",
+                "grade": _FALLBACK_GRADES[g]
+            })
+        
+        return results
+
+
 class SemanticGradingAgent:
     """
     Agent responsible for grading descriptive answers using NVIDIA NIM.
@@ -13,66 +157,106 @@ class SemanticGradingAgent:
     """
     
     def __init__(self):
-        self.api_key = settings.NVIDIA_API_KEY
-        self.base_url = "https://integrate.api.nvidia.com/v1"
-        self.client = OpenAI(api_key=self.api_key, base_url=self.base_url) if self.api_key else None
-        self.model = settings.NVIDIA_LLM_MODEL
+        self.api_key = _API_KEY
+        self.base_url = NIM_BASE_URL
+        self.client = nim_client
+        self.fallback = MockOverlapGrader()
+        self.model = _MODEL
+        self.embed_model = _EMBED_MODEL
+        self.cache = GradeCache(
+            max_entries=_CACHE_SIZE,
+            similarity=_CACHE_SIMILARITY
+        )
         logger.info(f"NVIDIA Semantic Grader initialized: {'Configured' if self.client else 'Mock Mode'}")
 
-    def grade_answer(self, student_answer: str, model_answer: str, max_points: float = 1.0) -> Dict[str, Any]:
+    async def grade_answer(self, student_answer: str, model_answer: str, max_points: float = 1.0) -> Dict[str, Any]:
         """
         Grade a descriptive answer using NVIDIA NIM.
         """
         if not student_answer or not student_answer.strip():
             return {"score": 0.0, "percentage": 0, "feedback": "No answer provided.", "grade": "F"}
         
+        if _is_verbatim(student_answer, model_answer):
+            return _verbatim_result(max_points)
+        
         if not self.client:
             # Fallback to simple matching if no API key
-            return self._mock_grade(student_answer, model_answer, max_points)
+            return self.fallback.grade(student_answer, model_answer, max_points)
 
-        prompt = f"""
-        Compare the student's answer to the model answer and provide a grade.
-        
-        Model Answer: {model_answer}
-        Student's Answer: {student_answer}
+        cached = self.cache.get_exact(student_answer, model_answer, max_points)
+        if cached is not None:
+            return cached
         
-        Criteria:
-        - Check for semantic similarity and key concept coverage.
-        - Ignore minor grammatical errors.
-        - Return a JSON object with:
-            - score (float out of {max_points})
-            - percentage (int 0-100)
-            - feedback (string explaining the score)
-            - grade (A+, A, B, C, D, or F)
-        """
+        # The similarity tier costs an embedding call per answer, so only when it is enabled
+        embedding = await self._embed(student_answer) if self.cache.similarity is not None else None
+        if embedding is not None:
+            cached = self.cache.get_similar(embedding, model_answer, max_points)
+            if cached is not None:
+                return cached
+
+        # Fixed instructions and model answer first, student answer last, so repeat
+        # grading of one question shares the longest possible prompt prefix
+        prompt = f"""Grade the student's answer against the model answer on semantic similarity and key concept coverage; ignore minor grammatical errors.
+Return only JSON: {{"score": float out of {max_points}, "percentage": int 0-100, "feedback": one short sentence, "grade": "A+"|"A"|"B"|"C"|"D"|"F"}}
+
+Model Answer: {model_answer}
+Student's Answer: {student_answer}"""
 
         try:
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model=self.model,
                 messages=[{"role": "user", "content": prompt}],
-                temperature=0.1,
+                temperature=0,
+                top_p=1,
+                max_tokens=GRADE_MAX_TOKENS,
+                stream=False,
                 response_format={ "type": "json_object" }
             )
-            return json.loads(response.choices[0].message.content)
+            result = _normalise_reply(json.loads(response.choices[0].message.content), max_points)
         except Exception as e:
             logger.error(f"NVIDIA Grading Error: {e}")
-            return self._mock_grade(student_answer, model_answer, max_points)
+            return self.fallback.grade(student_answer, model_answer, max_points)
+        
+        self.cache.put(student_answer, model_answer, max_points, result, embedding)
+        return result
 
-    def _mock_grade(self, student_answer: str, model_answer: str, max_points: float) -> Dict[str, Any]:
-        """Simple keyword-based fallback grading."""
-        student_words = set(student_answer.lower().split())
-        model_words = set(model_answer.lower().split())
-        overlap = len(student_words.intersection(model_words))
-        ratio = overlap / len(model_words) if model_words else 0
+    async def _embed(self, text: str) -> Optional[np.ndarray]:
+        """Embed an answer with the NIM embedding model; None if unavailable."""
+        try:
+            response = await self.client.embeddings.create(
+                model=self.embed_model,
+                input=[text],
+                encoding_format="float",
+                extra_body={"input_type": "query", "truncate": "END"}
+            )
+            return np.asarray(response.data[0].embedding, dtype=np.float32)
+        except Exception as e:
+            logger.warning("NVIDIA Embedding Error: %s", e)
+            return None
+
+    async def batch_grade(self, answers: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Grade many descriptive answers at once.
         
-        percentage = int(ratio * 100)
-        score = round(ratio * max_points, 2)
+        Args:
+            answers: Dicts with student_answer, model_answer and optional max_points
+            
+        Returns:
+            One grading result per answer, in input order
+        """
+        if self.client:
+            # Concurrent NIM calls, bounded so a large batch cannot flood the endpoint
+            semaphore = asyncio.Semaphore(_MAX_CONCURRENCY)
+            
+            async def grade_one(a: Dict[str, Any]) -> Dict[str, Any]:
+                async with semaphore:
+                    return await self.grade_answer(
+                        a.get('student_answer', ''), a.get('model_answer', ''), a.get('max_points', 1.0)
+                    )
+            
+            return list(await asyncio.gather(*(grade_one(a) for a in answers)))
         
-        return {
-            "score": score,
-            "percentage": percentage,
-            "feedback": "Graded via fallback keyword matching.",
-            "grade": "C" if ratio > 0.4 else "F"
-        }
+        return self.fallback.grade_batch(answers)
 
+# Singleton instance
 grading_agent = SemanticGradingAgent()
@@ -1,37 +1,62 @@
 """
 Analytics and Dashboard API Routes - MongoDB Version
 """
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Any, Dict, List
 from beanie import PydanticObjectId
 
-from app.db.models import User, Exam, Submission, Answer, UserRole, LoginRecord
+from app.db.models import User, Exam, Submission, SubmissionSlim, Answer, UserRole, LoginRecord
 from app.agents.analytics import analytics_agent
 from .auth import get_current_user, require_role
 
 router = APIRouter(prefix="/analytics", tags=["Analytics"])
 
+
+async def _fetch_slim(document, ids: list, fields: List[str]) -> Dict[Any, Dict[str, Any]]:
+    """
+    Raw Motor $in lookup for dashboard joins, skipping model validation.
+    
+    Returns:
+        Map of _id to a plain dict holding only the requested fields
+    """
+    if not ids:
+        return {}
+    cursor = document.get_motor_collection().find({"_id": {"$in": ids}}, {field: 1 for field in fields})
+    return {doc["_id"]: doc async for doc in cursor}
+
 @router.get("/student/me")
 async def get_my_analytics(user: User = Depends(get_current_user)):
     """Get current student's performance analytics and history."""
-    submissions = await Submission.find(
-        Submission.user_id == user.id,
-        Submission.status == "graded"
-    ).sort(-Submission.submitted_at).to_list()
+    # Submissions joined to their exam titles in one server-side pipeline
+    submissions = await Submission.aggregate([
+        {"$match": {"user_id": user.id, "status": "graded"}},
+        {"$sort": {"submitted_at": -1}},
+        {"$lookup": {"from": "exams", "localField": "exam_id", "foreignField": "_id", "as": "exam"}},
+        {"$project": {
+            "percentage": 1,
+            "total_score": 1,
+            "submitted_at": 1,
+            "exam_title": {"$arrayElemAt": ["$exam.title", 0]}
+        }}
+    ]).to_list()
     
-    submission_data = [{"percentage": s.percentage, "total_score": s.total_score} for s in submissions]
+    submission_data = [
+        {"percentage": s.get("percentage", 0.0), "total_score": s.get("total_score", 0.0)}
+        for s in submissions
+    ]
     analytics = analytics_agent.calculate_student_performance(submission_data)
     
-    # Get exam details for each submission
-    history = []
-    for s in submissions:
-        exam = await Exam.get(s.exam_id)
-        history.append({
-            "id": str(s.id),
-            "exam_title": exam.title if exam else "Unknown Exam",
-            "percentage": s.percentage,
-            "submitted_at": s.submitted_at
-        })
+    history = [
+        {
+            "id": str(s["_id"]),
+            "exam_title": s.get("exam_title") or "Unknown Exam",
+            "percentage": s.get("percentage", 0.0),
+            "submitted_at": s.get("submitted_at")
+        }
+        for s in submissions
+    ]
     
     return {
         "user": user.username, 
@@ -42,7 +67,7 @@ async def get_my_analytics(user: User = Depends(get_current_user)):
 @router.get("/exam/{exam_id}")
 async def get_exam_analytics(
     exam_id: str,
-    user: User = Depends(require_role(["teacher", "admin"]))
+    user: User = Depends(require_role(("teacher", "admin")))
 ):
     """Get exam performance analytics (Teacher/Admin only)."""
     exam = await Exam.get(PydanticObjectId(exam_id))
@@ -52,65 +77,107 @@ async def get_exam_analytics(
     submissions = await Submission.find(
         Submission.exam_id == exam.id,
         Submission.status == "graded"
-    ).to_list()
+    ).project(SubmissionSlim).to_list()
     
     submission_data = [{"percentage": s.percentage} for s in submissions]
     exam_data = {"passing_score": exam.passing_score}
     
+    # Only the three scoring fields of each answer are fetched, as raw documents
+    answers = await Answer.get_motor_collection().find(
+        {"submission_id": {"$in": [s.id for s in submissions]}},
+        {"_id": 0, "question_id": 1, "score": 1, "is_correct": 1}
+    ).to_list(length=None) if submissions else []
+    
     analytics = analytics_agent.analyze_exam_performance(exam_data, submission_data)
-    return {"exam": exam.title, "analytics": analytics}
+    return {
+        "exam": exam.title,
+        "analytics": analytics,
+        "question_stats": analytics_agent.analyze_question_difficulty(answers)
+    }
 
 @router.get("/dashboard/teacher")
-async def teacher_dashboard(user: User = Depends(require_role(["teacher", "admin"]))):
-    """Get teacher dashboard overview."""
-    exams = await Exam.find(Exam.created_by == user.id).to_list()
-    exam_ids = [e.id for e in exams]
+async def teacher_dashboard(
+    limit: int = Query(100, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    user: User = Depends(require_role(("teacher", "admin")))
+):
+    """Get teacher dashboard overview with the most recent submissions, paginated."""
+    exams = await Exam.get_motor_collection().find(
+        {"created_by": user.id}, {"title": 1, "is_active": 1}
+    ).to_list(length=None)
+    exam_ids = [e["_id"] for e in exams]
     
-    # Get all submissions for teacher's exams
-    submissions = await Submission.find(
-        {"exam_id": {"$in": exam_ids}, "status": "graded"}
-    ).sort(-Submission.submitted_at).to_list()
+    # Get one page of submissions for teacher's exams plus the overall count;
+    # the average score and activity timestamps cover every graded submission
+    graded = {"exam_id": {"$in": exam_ids}, "status": "graded"}
+    submissions, total_submissions, summary_rows = await asyncio.gather(
+        Submission.find(graded).sort(-Submission.submitted_at)
+            .skip(offset).limit(limit).project(SubmissionSlim).to_list(),
+        Submission.find(graded).count(),
+        Submission.aggregate([
+            {"$match": graded},
+            {"$group": {
+                "_id": None,
+                "average_percentage": {"$avg": "$percentage"},
+                "submitted_at": {"$push": "$submitted_at"}
+            }}
+        ]).to_list()
+    )
+    summary = summary_rows[0] if summary_rows else {}
+    
+    # Get student details in one query alongside login activity for the last 7 days;
+    # exam details come from the teacher's exams already loaded
+    student_ids = list({s.user_id for s in submissions})
+    student_map, login_records = await asyncio.gather(
+        _fetch_slim(User, student_ids, ["full_name", "username"]),
+        LoginRecord.find_all().to_list() # For simplicity, getting all for now. Ideally filter by date.
+    )
+    exam_map = {e["_id"]: e for e in exams}
     
-    # Get student and exam details for each submission
     student_submissions = []
     for s in submissions:
-        student = await User.get(s.user_id)
-        exam = await Exam.get(s.exam_id)
+        student = student_map.get(s.user_id)
+        exam = exam_map.get(s.exam_id)
         student_submissions.append({
             "id": str(s.id),
-            "student_name": student.full_name if student else "Unknown",
-            "student_username": student.username if student else "",
-            "exam_title": exam.title if exam else "Unknown",
+            "student_name": student.get("full_name", "Unknown") if student else "Unknown",
+            "student_username": student.get("username", "") if student else "",
+            "exam_title": exam.get("title", "Unknown") if exam else "Unknown",
             "percentage": s.percentage,
-            "submitted_at": s.submitted_at.isoformat() if s.submitted_at else None
+            "submitted_at": s.submitted_at
         })
     
-    # Get login activity for the last 7 days
-    login_records = await LoginRecord.find_all().to_list() # For simplicity, getting all for now. Ideally filter by date.
-    
     return {
         "total_exams_created": len(exams),
-        "total_submissions": len(submissions),
-        "exams": [{"id": str(e.id), "title": e.title, "is_active": e.is_active} for e in exams],
+        "total_submissions": total_submissions,
+        "limit": limit,
+        "offset": offset,
+        "exams": [{"id": str(e["_id"]), "title": e.get("title"), "is_active": e.get("is_active", True)} for e in exams],
         "student_submissions": student_submissions,
-        "login_activity": [{"timestamp": lr.timestamp.isoformat()} for lr in login_records],
-        "submission_activity": [{"timestamp": s.submitted_at.isoformat()} for s in submissions if s.submitted_at]
+        "login_activity": [{"timestamp": lr.timestamp} for lr in login_records],
+        "average_percentage": summary.get("average_percentage"),
+        "submission_activity": [{"timestamp": ts} for ts in summary.get("submitted_at", []) if ts]
     }
 
 @router.get("/dashboard/admin")
-async def admin_dashboard(user: User = Depends(require_role(["admin"]))):
+async def admin_dashboard(user: User = Depends(require_role(("admin",)))):
     """Get admin dashboard overview."""
-    users = await User.find_all().to_list()
-    exams = await Exam.find_all().to_list()
-    submissions = await Submission.find_all().to_list()
+    # Counts are computed by MongoDB; no documents are loaded
+    total_users, total_exams, total_submissions, role_rows = await asyncio.gather(
+        User.find_all().count(),
+        Exam.find_all().count(),
+        Submission.find_all().count(),
+        User.aggregate([{"$group": {"_id": "$role", "count": {"$sum": 1}}}]).to_list()
+    )
+    role_counts = {row["_id"]: row["count"] for row in role_rows}
     
     return {
-        "total_users": len(users),
-        "total_exams": len(exams),
-        "total_submissions": len(submissions),
+        "total_users": total_users,
+        "total_exams": total_exams,
+        "total_submissions": total_submissions,
         "users_by_role": {
-            "students": len([u for u in users if u.role == UserRole.STUDENT]),
-            "teachers": len([u for u in users if u.role == UserRole.TEACHER]),
-            "admins": len([u for u in users if u.role == UserRole.ADMIN])
+            "students": role_counts.get(UserRole.STUDENT.value, 0),
+            "teachers": role_counts.get(UserRole.TEACHER.value, 0),
+            "admins": role_counts.get(UserRole.ADMIN.value, 0)
         }
     }
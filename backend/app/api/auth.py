@@ -1,68 +1,89 @@
 """
 Authentication API Routes - MongoDB Version
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+import hashlib
+import time
+from functools import lru_cache
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
 from datetime import timedelta
-from typing import List
+from typing import FrozenSet, Iterable, List
 from beanie import PydanticObjectId
+from cachetools import TTLCache
+from pydantic import TypeAdapter
+from pymongo.errors import DuplicateKeyError
 
-from app.db.models import User, UserRole, LoginRecord
-from app.core.security import verify_password, get_password_hash, create_access_token, decode_token, oauth2_scheme
+from app.db.models import User, UserSlim, UserRole, LoginRecord
+from app.core.security import verify_and_update_password, get_password_hash, create_access_token, decode_token, oauth2_scheme
 from app.core.config import settings
 from .schemas import UserCreate, UserLogin, UserResponse, Token
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
+# Serialises user lists to JSON bytes in one pass, skipping FastAPI's re-encoding
+_user_list_adapter = TypeAdapter(List[UserResponse])
+
 @router.post("/register", response_model=UserResponse)
 async def register(user_data: UserCreate):
     """Register a new user."""
-    # Check existing username
-    existing_user = await User.find_one(User.username == user_data.username)
-    if existing_user:
-        raise HTTPException(status_code=400, detail="Username already exists")
-    
-    # Check existing email
-    existing_email = await User.find_one(User.email == user_data.email)
-    if existing_email:
+    # Check existing username or email in one query; only the username comes back,
+    # enough to tell which field clashed without loading the whole document
+    existing = await User.get_motor_collection().find_one(
+        {"$or": [{"username": user_data.username}, {"email": user_data.email}]},
+        {"_id": 0, "username": 1}
+    )
+    if existing:
+        if existing["username"] == user_data.username:
+            raise HTTPException(status_code=400, detail="Username already exists")
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    # Create user
+    # Create user; password hashing runs in a worker thread so the event loop keeps serving requests
+    password_hash = await asyncio.to_thread(get_password_hash, user_data.password)
     user = User(
         username=user_data.username,
         email=user_data.email,
-        password_hash=get_password_hash(user_data.password),
+        password_hash=password_hash,
         full_name=user_data.full_name,
         role=UserRole(user_data.role.value),
         accessibility_mode=user_data.accessibility_mode
     )
-    await user.insert()
+    try:
+        await user.insert()
+    except DuplicateKeyError:
+        # A concurrent registration won the race past the check above
+        raise HTTPException(status_code=400, detail="Username or email already registered")
     
-    return UserResponse(
-        id=str(user.id),
-        username=user.username,
-        email=user.email,
-        full_name=user.full_name,
-        role=user.role.value,
-        accessibility_mode=user.accessibility_mode
-    )
+    return UserResponse.model_validate(user)
 
 @router.post("/login", response_model=Token)
 async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     """Login and get access token. Accepts username or email."""
-    # Try to find user by username first, then by email
-    user = await User.find_one(User.username == form_data.username)
+    # Match username or email in one query; a username match wins if both hit
+    candidates = await User.find({"$or": [
+        {"username": form_data.username},
+        {"email": form_data.username}
+    ]}).limit(2).to_list()
+    user = next((u for u in candidates if u.username == form_data.username), None)
+    if not user and candidates:
+        user = candidates[0]
     
-    # If not found by username, try email
-    if not user:
-        user = await User.find_one(User.email == form_data.username)
-    
-    if not user or not verify_password(form_data.password, user.password_hash):
+    verified, new_hash = (
+        await asyncio.to_thread(verify_and_update_password, form_data.password, user.password_hash)
+        if user else (False, None)
+    )
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password"
         )
     
+    # Upgrade legacy bcrypt (or outdated Argon2) hashes while we have the plain password
+    if new_hash:
+        user.password_hash = new_hash
+        await user.save()
+    
     access_token = create_access_token(
         data={"sub": user.username, "role": user.role.value},
         expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -72,19 +93,34 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     login_record = LoginRecord(user_id=user.id)
     await login_record.insert()
     
-    user_response = UserResponse(
-        id=str(user.id),
-        username=user.username,
-        email=user.email,
-        full_name=user.full_name,
-        role=user.role.value,
-        accessibility_mode=user.accessibility_mode
-    )
+    user_response = UserResponse.model_validate(user)
     
     return Token(access_token=access_token, user=user_response)
 
+# Authenticated users by token digest, with the token's expiry, so repeat requests
+# skip both signature verification and the user lookup
+_user_cache: TTLCache = TTLCache(maxsize=10_000, ttl=60)
+
+def _token_key(token: str) -> bytes:
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+def invalidate_cached_user(user_id: PydanticObjectId) -> None:
+    """Drop cached sessions of a user whose record changed."""
+    for key, (cached, _) in list(_user_cache.items()):
+        if cached.id == user_id:
+            _user_cache.pop(key, None)
+
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
     """Get current authenticated user."""
+    key = _token_key(token)
+    cached = _user_cache.get(key)
+    if cached is not None:
+        user, exp = cached
+        # A token that expires while cached must go back through full verification
+        if exp > time.time():
+            return user
+        _user_cache.pop(key, None)
+    
     payload = decode_token(token)
     username = payload.get("sub")
     if not username:
@@ -93,50 +129,47 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
     user = await User.find_one(User.username == username)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    _user_cache[key] = (user, payload.get("exp", 0))
     return user
 
 @router.get("/me", response_model=UserResponse)
 async def get_me(current_user: User = Depends(get_current_user)):
     """Get current authenticated user."""
-    return UserResponse(
-        id=str(current_user.id),
-        username=current_user.username,
-        email=current_user.email,
-        full_name=current_user.full_name,
-        role=current_user.role.value,
-        accessibility_mode=current_user.accessibility_mode
-    )
+    return UserResponse.model_validate(current_user)
 
-def require_role(allowed_roles: list):
+def require_role(allowed_roles: Iterable[str]):
     """Dependency to check user role."""
+    return _role_checker(frozenset(allowed_roles))
+
+@lru_cache(maxsize=32)
+def _role_checker(allowed: FrozenSet[str]):
+    # One checker per distinct role set, so routes share it and FastAPI resolves it once per request
     async def role_checker(user: User = Depends(get_current_user)):
-        if user.role.value not in allowed_roles:
+        if user.role.value not in allowed:
             raise HTTPException(status_code=403, detail="Insufficient permissions")
         return user
     return role_checker
 
 # ============== ADMIN ONLY ROUTES ==============
 
-@router.get("/users", response_model=List[UserResponse])
-async def list_users(current_user: User = Depends(require_role(["admin", "teacher"]))):
-    """List all users (Admin/Teacher only)."""
-    users = await User.find_all().to_list()
-    return [
-        UserResponse(
-            id=str(u.id),
-            username=u.username,
-            email=u.email,
-            full_name=u.full_name,
-            role=u.role.value,
-            accessibility_mode=u.accessibility_mode
-        ) for u in users
-    ]
+@router.get("/users", responses={200: {"model": List[UserResponse]}})
+async def list_users(
+    limit: int = Query(100, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    current_user: User = Depends(require_role(("admin", "teacher")))
+):
+    """List users one page at a time (Admin/Teacher only)."""
+    users = await User.find_all().sort(+User.username).skip(offset).limit(limit).project(UserSlim).to_list()
+    payload = _user_list_adapter.dump_json(
+        _user_list_adapter.validate_python(users, from_attributes=True)
+    )
+    return Response(payload, media_type="application/json")
 
 @router.patch("/users/{user_id}/role", response_model=UserResponse)
 async def update_user_role(
     user_id: str, 
     new_role: str,
-    admin: User = Depends(require_role(["admin", "teacher"]))
+    admin: User = Depends(require_role(("admin", "teacher")))
 ):
     """Update a user's role (Admin/Teacher only)."""
     if new_role not in ["student", "teacher", "admin"]:
@@ -156,20 +189,14 @@ async def update_user_role(
         
     user.role = UserRole(new_role)
     await user.save()
+    invalidate_cached_user(user.id)
     
-    return UserResponse(
-        id=str(user.id),
-        username=user.username,
-        email=user.email,
-        full_name=user.full_name,
-        role=user.role.value,
-        accessibility_mode=user.accessibility_mode
-    )
+    return UserResponse.model_validate(user)
 
 @router.delete("/users/{user_id}")
 async def delete_user(
     user_id: str, 
-    admin: User = Depends(require_role(["admin"]))
+    admin: User = Depends(require_role(("admin",)))
 ):
     """Delete a user (Admin only)."""
     user = await User.get(PydanticObjectId(user_id))
@@ -182,4 +209,5 @@ async def delete_user(
         raise HTTPException(status_code=400, detail="Admins cannot delete themselves")
         
     await user.delete()
+    invalidate_cached_user(user.id)
     return {"message": "User deleted successfully"}
@@ -1,26 +1,131 @@
 """
 Exam Management API Routes - MongoDB Version
 """
+import asyncio
+import mmap
+import shutil
+from contextlib import contextmanager
+
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
-from typing import List, Optional
+from fastapi.responses import ORJSONResponse
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 from beanie import PydanticObjectId
-from datetime import datetime
+from beanie.operators import In
+from cachetools import TTLCache
+from pymongo import UpdateOne
+from datetime import datetime, timezone
 import os
 import logging
 
 logger = logging.getLogger(__name__)
 
-from app.db.models import User, Exam, Question, Submission, Answer
+from app.db.models import User, Exam, Question, QuestionSlim, Submission, Answer, AnswerScore
 from app.agents.orchestrator import orchestrator
+from app.agents.question_pool import QuestionPool
 from app.core.config import settings
 from .auth import get_current_user, require_role
 from .schemas import ExamCreate, ExamResponse, ExamFullResponse, QuestionCreate, QuestionResponse, AnswerSubmit, GradingResult, SubmissionReview, ExamAICreate
-from app.core.file_processor import extract_text_from_file
+from app.core.file_processor import extract_text_from_file_async
 from app.agents.nvidia_generator import nvidia_gen
 import json
 
 router = APIRouter(prefix="/exams", tags=["Exams"])
 
+# Exams and their questions by exam id; question sets do not change during a sitting.
+# Entries are dropped on edit/delete, and the TTL bounds staleness across workers.
+_exam_cache: TTLCache = TTLCache(maxsize=1024, ttl=300)
+
+# Uploaded answer sheets are copied to disk in chunks of this size
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+async def _load_exam_with_questions(
+    exam_id: PydanticObjectId
+) -> Tuple[Optional[Exam], Dict[str, int], Optional[QuestionPool]]:
+    """
+    Load an exam and its questions, served from the in-process cache when possible.
+    
+    Returns:
+        The exam (None if missing), each question's position in sequential (id)
+        order keyed by question id, and the exam's question pool in that order
+    """
+    cached = _exam_cache.get(exam_id)
+    if cached is not None:
+        return cached
+    
+    exam = await Exam.get(exam_id)
+    if not exam:
+        return None, {}, None
+    # Ordered by _id in Mongo, so sequential exams never sort in Python
+    questions = await Question.find(Question.exam_id == exam.id).sort("_id").project(QuestionSlim).to_list()
+    positions = {str(q.id): i for i, q in enumerate(questions)}
+    # Built once per exam rather than on every start and answer of a sitting
+    pool = QuestionPool.from_dicts([
+        {"id": str(q.id), "difficulty": q.difficulty, "question_text": q.question_text,
+         "question_type": q.question_type, "options": q.options, "points": q.points}
+        for q in questions
+    ])
+    _exam_cache[exam_id] = (exam, positions, pool)
+    return exam, positions, pool
+
+async def _get_exam(exam_id: PydanticObjectId) -> Optional[Exam]:
+    """An exam by id for read-only use, from the exam cache when it is already loaded."""
+    cached = _exam_cache.get(exam_id)
+    return cached[0] if cached is not None else await Exam.get(exam_id)
+
+def _invalidate_exam(exam_id: PydanticObjectId) -> None:
+    _exam_cache.pop(exam_id, None)
+
+async def _record_answered(submission: Submission, question_id: PydanticObjectId) -> List[str]:
+    """
+    Add a question to the submission's answered ids and return them.
+    Sessions started before the ids were tracked are backfilled from their answers once.
+    """
+    if submission.answered_question_ids is None:
+        # distinct returns just the ids, without decoding whole Answer documents
+        answered = await Answer.get_motor_collection().distinct(
+            "question_id", {"submission_id": submission.id}
+        )
+        submission.answered_question_ids = [str(qid) for qid in answered]
+        # Store the backfilled list so later answers can add to it atomically
+        await Submission.get_motor_collection().update_one(
+            {"_id": submission.id},
+            {"$set": {"answered_question_ids": submission.answered_question_ids}}
+        )
+    
+    qid = str(question_id)
+    if qid not in submission.answered_question_ids:
+        submission.answered_question_ids.append(qid)
+    return submission.answered_question_ids
+
+def _save_progress(submission: Submission, question_id: PydanticObjectId):
+    """
+    Write only what an answer changes, atomically, rather than replacing the whole submission.
+    Adding to the answered ids server-side keeps concurrent answers from overwriting each other.
+    """
+    return Submission.get_motor_collection().update_one(
+        {"_id": submission.id},
+        {
+            "$set": {"current_ability": submission.current_ability},
+            "$addToSet": {"answered_question_ids": str(question_id)}
+        }
+    )
+
+def _save_upload(upload: UploadFile, file_path: str) -> None:
+    """Copy an uploaded file to disk in chunks, without reading it all into memory."""
+    upload.file.seek(0)
+    with open(file_path, "wb") as out:
+        shutil.copyfileobj(upload.file, out, UPLOAD_CHUNK_SIZE)
+
+@contextmanager
+def _map_file(file_path: str) -> Iterator[Union[mmap.mmap, bytes]]:
+    """Read-only memory map of a saved file (empty bytes for an empty file, which cannot be mapped)."""
+    with open(file_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b""
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
 @router.post("/preview-ai", response_model=List[QuestionCreate])
 async def preview_exam_ai(
     num_questions: int = Form(10),
@@ -29,18 +134,18 @@ async def preview_exam_ai(
     exam_mode: str = Form("mixed"),
     instructions: Optional[str] = Form(None),
     file: UploadFile = File(...),
-    user: User = Depends(require_role(["teacher", "admin"]))
+    user: User = Depends(require_role(("teacher", "admin")))
 ):
     """Analyze PDF and generate a preview of questions for teacher review."""
     upload_dir = settings.UPLOAD_DIR
     os.makedirs(upload_dir, exist_ok=True)
-    file_path = os.path.join(upload_dir, f"preview_{datetime.utcnow().timestamp()}_{file.filename}")
+    file_path = os.path.join(upload_dir, f"preview_{datetime.now(timezone.utc).timestamp()}_{file.filename}")
     
     with open(file_path, "wb") as buffer:
         buffer.write(await file.read())
         
     try:
-        text_content = extract_text_from_file(file_path)
+        text_content = await extract_text_from_file_async(file_path)
         
         if not text_content or not text_content.strip():
             raise HTTPException(
@@ -90,20 +195,20 @@ async def create_exam_ai(
     proctoring_enabled: bool = Form(False),
     instructions: Optional[str] = Form(None),
     file: UploadFile = File(...),
-    user: User = Depends(require_role(["teacher", "admin"]))
+    user: User = Depends(require_role(("teacher", "admin")))
 ):
     """Automatically generate an exam from study material using NVIDIA AI."""
     # Save the file temporarily
     upload_dir = settings.UPLOAD_DIR
     os.makedirs(upload_dir, exist_ok=True)
-    file_path = os.path.join(upload_dir, f"material_{datetime.utcnow().timestamp()}_{file.filename}")
+    file_path = os.path.join(upload_dir, f"material_{datetime.now(timezone.utc).timestamp()}_{file.filename}")
     
     with open(file_path, "wb") as buffer:
         buffer.write(await file.read())
         
     try:
         # Extract text
-        text_content = extract_text_from_file(file_path)
+        text_content = await extract_text_from_file_async(file_path)
         
         # Parse JSON from Form strings
         diff_dist = json.loads(difficulty_distribution)
@@ -141,9 +246,9 @@ async def create_exam_ai(
         )
         await exam.insert()
         
-        # Save Generated Questions
-        for q in questions_data:
-            question = Question(
+        # Save Generated Questions in one batch
+        questions = [
+            Question(
                 exam_id=exam.id,
                 question_text=q["question_text"],
                 question_type=q["question_type"],
@@ -156,7 +261,10 @@ async def create_exam_ai(
                 concept_tags=q.get("concept_tags", []),
                 adaptive_variants=q.get("adaptive_variants", [])
             )
-            await question.insert()
+            for q in questions_data
+        ]
+        if questions:
+            await Question.insert_many(questions, ordered=False)
             
         return ExamResponse(
             id=str(exam.id),
@@ -181,7 +289,7 @@ async def create_exam_ai(
 @router.post("/create", response_model=ExamResponse)
 async def create_exam(
     exam_data: ExamCreate,
-    user: User = Depends(require_role(["teacher", "admin"]))
+    user: User = Depends(require_role(("teacher", "admin")))
 ):
     """Create a new exam (Teacher/Admin only)."""
     exam = Exam(
@@ -198,8 +306,8 @@ async def create_exam(
     )
     await exam.insert()
     
-    for q in exam_data.questions:
-        question = Question(
+    questions = [
+        Question(
             exam_id=exam.id,
             question_text=q.question_text,
             question_type=q.question_type,
@@ -209,7 +317,11 @@ async def create_exam(
             correct_answer=q.correct_answer,
             model_answer=q.model_answer
         )
-        await question.insert()
+        for q in exam_data.questions
+    ]
+    if questions:
+        # ObjectIds are assigned client-side in list order, so unordered inserts keep question order
+        await Question.insert_many(questions, ordered=False)
     
     return ExamResponse(
         id=str(exam.id),
@@ -224,43 +336,49 @@ async def create_exam(
         passing_score=exam.passing_score
     )
 
-@router.get("/available", response_model=List[ExamResponse])
+@router.get("/available", responses={200: {"model": List[ExamResponse]}})
 async def list_available_exams(user: User = Depends(get_current_user)):
     """List all active exams available for students."""
     exams = await Exam.find(Exam.is_active == True).to_list()
     
     # Get all submissions for this user to check status, sorted by most recent first
-    user_submissions = await Submission.find(
-        Submission.user_id == user.id
-    ).sort(-Submission.started_at).to_list()
+    # Only the exam id and status are needed, read straight off the (user_id, started_at) index
+    user_submissions = await Submission.get_motor_collection().find(
+        {"user_id": user.id},
+        {"_id": 0, "exam_id": 1, "status": 1}
+    ).sort("started_at", -1).to_list(length=None)
     
     # Use string IDs for mapping; sort ensures the latest status is picked for each exam_id
     submission_map = {}
     for s in user_submissions:
-        eid = str(s.exam_id)
+        eid = str(s["exam_id"])
         if eid not in submission_map:
-            submission_map[eid] = s.status
-    
-    return [
-        ExamResponse(
-            id=str(e.id),
-            title=e.title,
-            description=e.description,
-            is_adaptive=e.is_adaptive,
-            exam_mode=e.exam_mode,
-            proctoring_enabled=e.proctoring_enabled,
-            duration_minutes=e.duration_minutes,
-            total_questions=e.total_questions,
-            total_marks=e.total_marks,
-            passing_score=e.passing_score,
-            user_status=submission_map.get(str(e.id))
-        ) for e in exams
-    ]
+            submission_map[eid] = s.get("status", "in_progress")
+    
+    # Plain dicts in the ExamResponse shape go straight to orjson, skipping
+    # per-item model construction and FastAPI's response re-validation
+    return ORJSONResponse([
+        {
+            "id": str(e.id),
+            "title": e.title,
+            "description": e.description,
+            "is_adaptive": e.is_adaptive,
+            "exam_mode": e.exam_mode,
+            "proctoring_enabled": e.proctoring_enabled,
+            "duration_minutes": e.duration_minutes,
+            "total_questions": e.total_questions,
+            "total_marks": e.total_marks,
+            "passing_score": e.passing_score,
+            "is_active": e.is_active,
+            "created_at": e.created_at,
+            "user_status": submission_map.get(str(e.id))
+        } for e in exams
+    ])
 
 @router.get("/{exam_id}", response_model=ExamResponse)
 async def get_exam(exam_id: str, user: User = Depends(get_current_user)):
     """Get exam details."""
-    exam = await Exam.get(PydanticObjectId(exam_id))
+    exam = await _get_exam(PydanticObjectId(exam_id))
     if not exam:
         raise HTTPException(status_code=404, detail="Exam not found")
     return ExamResponse(
@@ -277,7 +395,7 @@ async def get_exam(exam_id: str, user: User = Depends(get_current_user)):
     )
 
 @router.get("/{exam_id}/details", response_model=ExamFullResponse)
-async def get_exam_details(exam_id: str, user: User = Depends(require_role(["teacher", "admin"]))):
+async def get_exam_details(exam_id: str, user: User = Depends(require_role(("teacher", "admin")))):
     """Get full exam details including questions."""
     exam = await Exam.get(PydanticObjectId(exam_id))
     if not exam:
@@ -317,7 +435,7 @@ async def get_exam_details(exam_id: str, user: User = Depends(require_role(["tea
 async def update_exam(
     exam_id: str,
     exam_data: ExamCreate,
-    user: User = Depends(require_role(["teacher", "admin"]))
+    user: User = Depends(require_role(("teacher", "admin")))
 ):
     """Update an existing exam."""
     exam = await Exam.get(PydanticObjectId(exam_id))
@@ -341,9 +459,12 @@ async def update_exam(
     
     # Delete old questions and insert new ones
     await Question.find(Question.exam_id == exam.id).delete()
+    # Invalidated again once the new questions are in: a load that ran between the delete
+    # and the insert would otherwise cache an empty question set
+    _invalidate_exam(exam.id)
     
-    for q in exam_data.questions:
-        question = Question(
+    questions = [
+        Question(
             exam_id=exam.id,
             question_text=q.question_text,
             question_type=q.question_type,
@@ -356,7 +477,11 @@ async def update_exam(
             concept_tags=q.concept_tags,
             adaptive_variants=q.adaptive_variants
         )
-        await question.insert()
+        for q in exam_data.questions
+    ]
+    if questions:
+        await Question.insert_many(questions, ordered=False)
+    _invalidate_exam(exam.id)
         
     return ExamResponse(
         id=str(exam.id),
@@ -374,14 +499,17 @@ async def update_exam(
 @router.post("/{exam_id}/start")
 async def start_exam(exam_id: str, user: User = Depends(get_current_user)):
     """Start an exam session."""
-    exam = await Exam.get(PydanticObjectId(exam_id))
+    exam_oid = PydanticObjectId(exam_id)
+    # Load the exam and check for an existing submission by this user at the same time
+    (exam, _, pool), existing_submission = await asyncio.gather(
+        _load_exam_with_questions(exam_oid),
+        Submission.find_one(
+            Submission.user_id == user.id,
+            Submission.exam_id == exam_oid
+        )
+    )
     if not exam:
         raise HTTPException(status_code=404, detail="Exam not found")
-    # Check if a submission already exists for this user and exam
-    existing_submission = await Submission.find_one(
-        Submission.user_id == user.id,
-        Submission.exam_id == exam.id
-    )
     
     if existing_submission:
         if existing_submission.status == "graded":
@@ -398,17 +526,12 @@ async def start_exam(exam_id: str, user: User = Depends(get_current_user)):
             user_id=user.id,
             exam_id=exam.id,
             status="in_progress",
-            current_ability=0.5
+            current_ability=0.5,
+            answered_question_ids=[]
         )
         await submission.insert()
     
-    # Get questions for this exam
-    questions_docs = await Question.find(Question.exam_id == exam.id).to_list()
-    
-    questions = [{"id": str(q.id), "difficulty": q.difficulty, "question_text": q.question_text, 
-                  "question_type": q.question_type, "options": q.options, "points": q.points} for q in questions_docs]
-    
-    session_info = await orchestrator.start_exam_session(str(user.id), str(exam.id), questions, exam.is_adaptive)
+    session_info = await orchestrator.start_exam_session(str(user.id), str(exam.id), pool, exam.is_adaptive)
     
     return {
         "submission_id": str(submission.id),
@@ -423,7 +546,7 @@ async def start_exam(exam_id: str, user: User = Depends(get_current_user)):
             "total_questions": exam.total_questions
         },
         "first_question": session_info.get("first_question"),
-        "total_questions": len(questions),
+        "total_questions": len(pool),
         "duration_minutes": exam.duration_minutes
     }
 
@@ -434,11 +557,14 @@ async def submit_answer(
     user: User = Depends(get_current_user)
 ):
     """Submit an answer for grading."""
-    submission = await Submission.get(PydanticObjectId(submission_id))
+    # Submission and question are independent lookups; fetch them together
+    submission, question = await asyncio.gather(
+        Submission.get(PydanticObjectId(submission_id)),
+        Question.get(PydanticObjectId(answer_data.question_id))
+    )
     if not submission or submission.user_id != user.id:
         raise HTTPException(status_code=404, detail="Submission not found")
     
-    question = await Question.get(PydanticObjectId(answer_data.question_id))
     if not question:
         raise HTTPException(status_code=404, detail="Question not found")
     
@@ -459,25 +585,19 @@ async def submit_answer(
         score=grading.get("score", 0),
         feedback=grading.get("feedback", "")
     )
-    await answer.insert()
     
     # Update submission ability and find next question
     next_question = None
     exam_complete = False
     
-    exam = await Exam.get(submission.exam_id)
-    questions_docs = await Question.find(Question.exam_id == exam.id).to_list()
+    exam, positions, pool = await _load_exam_with_questions(submission.exam_id)
     
-    # Get all answered questions for this submission
-    answered_docs = await Answer.find(Answer.submission_id == submission.id).to_list()
-    answered_ids = [str(a.question_id) for a in answered_docs]
+    # Answered questions are tracked on the submission and saved with it below
+    answered_ids = await _record_answered(submission, question.id)
     
     if exam.is_adaptive:
-        questions_list = [{"id": str(q.id), "difficulty": q.difficulty, "question_text": q.question_text, 
-                          "question_type": q.question_type, "options": q.options, "points": q.points} for q in questions_docs]
-        
         adaptive_data = await orchestrator.get_next_question(
-            questions=questions_list,
+            questions=pool,
             current_ability=submission.current_ability,
             answered_ids=answered_ids,
             last_answer_correct=grading.get("is_correct", False),
@@ -493,21 +613,15 @@ async def submit_answer(
             next_question = None
     else:
         # Sequential Flow
-        sorted_questions = sorted(questions_docs, key=lambda x: x.id)
-        current_q_index = -1
-        for i, q in enumerate(sorted_questions):
-            if str(q.id) == answer_data.question_id:
-                current_q_index = i
-                break
+        current_q_index = positions.get(answer_data.question_id, -1)
         
-        if current_q_index != -1 and current_q_index + 1 < len(sorted_questions):
-            nq = sorted_questions[current_q_index + 1]
-            next_question = {"id": str(nq.id), "difficulty": nq.difficulty, "question_text": nq.question_text,
-                            "question_type": nq.question_type, "options": nq.options, "points": nq.points}
+        if current_q_index != -1 and current_q_index + 1 < len(pool):
+            next_question = pool.questions[current_q_index + 1]
         else:
             exam_complete = True
     
-    await submission.save()
+    # The answer insert and submission update are independent writes; issue them together
+    await asyncio.gather(answer.insert(), _save_progress(submission, question.id))
     
     return {
         **grading,
@@ -522,16 +636,20 @@ async def finish_exam(submission_id: str, user: User = Depends(get_current_user)
     if not submission or submission.user_id != user.id:
         raise HTTPException(status_code=404, detail="Submission not found")
     
-    answers_docs = await Answer.find(Answer.submission_id == submission.id).to_list()
+    answers_docs = await Answer.find(Answer.submission_id == submission.id).project(AnswerScore).to_list()
     answers = [{"score": a.score, "is_correct": a.is_correct, "max_points": 1.0} for a in answers_docs]
     
     final_result = await orchestrator.finish_exam(str(submission.id), answers)
     
-    submission.status = "graded"
-    submission.total_score = final_result["total_score"]
-    submission.percentage = final_result["percentage"]
-    submission.submitted_at = datetime.utcnow()
-    await submission.save()
+    await Submission.get_motor_collection().update_one(
+        {"_id": submission.id},
+        {"$set": {
+            "status": "graded",
+            "total_score": final_result["total_score"],
+            "percentage": final_result["percentage"],
+            "submitted_at": datetime.now(timezone.utc)
+        }}
+    )
     
     return final_result
 
@@ -543,26 +661,24 @@ async def upload_answer(
     user: User = Depends(get_current_user)
 ):
     """Upload an image/PDF answer sheet for AI analysis."""
-    submission = await Submission.get(PydanticObjectId(submission_id))
+    submission, question = await asyncio.gather(
+        Submission.get(PydanticObjectId(submission_id)),
+        Question.get(PydanticObjectId(question_id))
+    )
     if not submission or submission.user_id != user.id:
         raise HTTPException(status_code=404, detail="Submission not found")
     
-    question = await Question.get(PydanticObjectId(question_id))
     if not question:
         raise HTTPException(status_code=404, detail="Question not found")
     
-    # Read file bytes
-    content = await file.read()
-    
-    # Save file to disk
+    # Stream file to disk
     upload_dir = "uploads"
     os.makedirs(upload_dir, exist_ok=True)
     file_ext = os.path.splitext(file.filename)[1]
-    filename = f"{submission_id}_{question_id}_{datetime.utcnow().timestamp()}{file_ext}"
+    filename = f"{submission_id}_{question_id}_{datetime.now(timezone.utc).timestamp()}{file_ext}"
     file_path = os.path.join(upload_dir, filename)
     
-    with open(file_path, "wb") as f:
-        f.write(content)
+    await asyncio.to_thread(_save_upload, file, file_path)
     
     # Processing through orchestrator (OCR + Grading)
     question_dict = {
@@ -572,11 +688,13 @@ async def upload_answer(
         "points": question.points
     }
     
-    grading = await orchestrator.process_answer(
-        question=question_dict,
-        student_answer="", 
-        image_bytes=content
-    )
+    # The saved file is memory-mapped, so the OS pages it in rather than it being copied into RAM
+    with _map_file(file_path) as content:
+        grading = await orchestrator.process_answer(
+            question=question_dict,
+            student_answer="", 
+            image_bytes=content
+        )
     
     # Store Answer
     answer = Answer(
@@ -590,28 +708,19 @@ async def upload_answer(
         original_ai_score=grading.get("score", 0),
         feedback=grading.get("feedback", ""),
     )
-    await answer.insert()
     
     # Check if exam is complete (Sequential Flow)
-    exam = await Exam.get(submission.exam_id)
-    questions_docs = await Question.find(Question.exam_id == exam.id).to_list()
-    answered_docs = await Answer.find(Answer.submission_id == submission.id).to_list()
-    answered_ids = [str(a.question_id) for a in answered_docs]
+    exam, positions, pool = await _load_exam_with_questions(submission.exam_id)
+    answered_ids = await _record_answered(submission, question.id)
+    await asyncio.gather(answer.insert(), _save_progress(submission, question.id))
     
     exam_complete = len(answered_ids) >= exam.total_questions
     next_question = None
     
     if not exam_complete:
-        sorted_qs = sorted(questions_docs, key=lambda x: x.id)
-        current_idx = -1
-        for i, q in enumerate(sorted_qs):
-            if str(q.id) == question_id:
-                current_idx = i
-                break
-        if current_idx != -1 and current_idx + 1 < len(sorted_qs):
-            nq = sorted_qs[current_idx + 1]
-            next_question = {"id": str(nq.id), "difficulty": nq.difficulty, "question_text": nq.question_text,
-                            "question_type": nq.question_type, "options": nq.options, "points": nq.points}
+        current_idx = positions.get(question_id, -1)
+        if current_idx != -1 and current_idx + 1 < len(pool):
+            next_question = pool.questions[current_idx + 1]
         else:
             exam_complete = True
 
@@ -635,26 +744,39 @@ async def get_submission(
     if user.role.value == "student" and submission.user_id != user.id:
         raise HTTPException(status_code=403, detail="You can only view your own entries")
 
-    exam = await Exam.get(submission.exam_id)
-    answers_docs = await Answer.find(Answer.submission_id == submission.id).to_list()
+    # Answers joined with their questions inside Mongo, fetched alongside the exam
+    pipeline = [
+        {"$match": {"submission_id": submission.id}},
+        {"$lookup": {"from": "questions", "localField": "question_id", "foreignField": "_id", "as": "question"}},
+        {"$unwind": {"path": "$question", "preserveNullAndEmptyArrays": True}},
+        {"$project": {
+            "student_answer": 1, "extracted_text": 1, "original_ai_score": 1, "score": 1,
+            "feedback": 1, "teacher_remarks": 1, "plagiarism_detected": 1, "image_path": 1,
+            "question.question_text": 1, "question.model_answer": 1, "question.points": 1
+        }}
+    ]
+    exam, answers_docs = await asyncio.gather(
+        _get_exam(submission.exam_id),
+        Answer.get_motor_collection().aggregate(pipeline).to_list(length=None)
+    )
     
-    # Get associated questions
     results = []
     for ans in answers_docs:
-        q = await Question.get(ans.question_id)
+        q = ans.get("question")
+        image_path = ans.get("image_path")
         results.append({
-            "answer_id": str(ans.id),
-            "question_text": q.question_text if q else "Question deleted",
-            "student_answer": ans.student_answer,
-            "extracted_text": ans.extracted_text,
-            "model_answer": q.model_answer if q else None,
-            "ai_score": ans.original_ai_score,
-            "current_score": ans.score,
-            "max_points": q.points if q else 1.0,
-            "feedback": ans.feedback,
-            "teacher_remarks": ans.teacher_remarks,
-            "plagiarism_detected": ans.plagiarism_detected,
-            "image_url": f"/api/{ans.image_path.replace('\\', '/')}" if ans.image_path else None
+            "answer_id": str(ans["_id"]),
+            "question_text": q.get("question_text") if q else "Question deleted",
+            "student_answer": ans.get("student_answer"),
+            "extracted_text": ans.get("extracted_text"),
+            "model_answer": q.get("model_answer") if q else None,
+            "ai_score": ans.get("original_ai_score", 0.0),
+            "current_score": ans.get("score", 0.0),
+            "max_points": q.get("points", 1.0) if q else 1.0,
+            "feedback": ans.get("feedback"),
+            "teacher_remarks": ans.get("teacher_remarks"),
+            "plagiarism_detected": ans.get("plagiarism_detected", False),
+            "image_url": f"/api/{image_path.replace('\\', '/')}" if image_path else None
         })
         
     return {
@@ -673,27 +795,40 @@ async def get_submission(
 @router.post("/review")
 async def review_submission(
     review_data: SubmissionReview,
-    user: User = Depends(require_role(["teacher", "admin"]))
+    user: User = Depends(require_role(("teacher", "admin")))
 ):
     """Teacher review endpoint: Modify scores, add remarks, and finalize results."""
     submission = await Submission.get(PydanticObjectId(review_data.submission_id))
     if not submission:
         raise HTTPException(status_code=404, detail="Submission not found")
     
+    # Load the reviewed answers and their questions with one query each
+    answer_ids = [PydanticObjectId(ar.answer_id) for ar in review_data.answer_reviews]
+    answers = await Answer.find(In(Answer.id, answer_ids)).to_list() if answer_ids else []
+    answer_map = {a.id: a for a in answers}
+    question_ids = list({a.question_id for a in answers})
+    questions = await Question.find(In(Question.id, question_ids)).to_list() if question_ids else []
+    points_map = {q.id: q.points for q in questions}
+    
     total_score = 0
     max_score = 0
-    for ar in review_data.answer_reviews:
-        answer = await Answer.get(PydanticObjectId(ar.answer_id))
+    updates = []
+    for answer_id, ar in zip(answer_ids, review_data.answer_reviews):
+        answer = answer_map.get(answer_id)
         if answer:
-            answer.score = ar.modified_score
-            answer.teacher_remarks = ar.teacher_remarks
-            await answer.save()
-            total_score += answer.score
+            updates.append(UpdateOne(
+                {"_id": answer.id},
+                {"$set": {"score": ar.modified_score, "teacher_remarks": ar.teacher_remarks}}
+            ))
+            total_score += ar.modified_score
             
             # Recalculate max score if needed
-            q = await Question.get(answer.question_id)
-            if q:
-                max_score += q.points
+            if answer.question_id in points_map:
+                max_score += points_map[answer.question_id]
+    
+    # All score changes go to the server in a single bulk write
+    if updates:
+        await Answer.get_motor_collection().bulk_write(updates)
         
     submission.total_score = total_score
     if max_score > 0:
@@ -710,7 +845,7 @@ async def review_submission(
 @router.delete("/{exam_id}")
 async def delete_exam(
     exam_id: str, 
-    user: User = Depends(require_role(["teacher", "admin"]))
+    user: User = Depends(require_role(("teacher", "admin")))
 ):
     """Delete an exam (Teacher/Admin only). Teachers can only delete their own exams."""
     exam = await Exam.get(PydanticObjectId(exam_id))
@@ -726,5 +861,6 @@ async def delete_exam(
     await Question.find(Question.exam_id == exam.id).delete()
     
     await exam.delete()
+    _invalidate_exam(exam.id)
     return {"message": "Exam deleted successfully"}
 
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
 from pydantic import BaseModel
-from fastapi.responses import Response
-from app.agents.riva_agent import riva_agent
+from fastapi.responses import StreamingResponse
+from app.agents.riva_agent import riva_agent, AUDIO_CHUNK_SIZE
 from app.api.auth import get_current_user
 import logging
 
@@ -11,21 +11,28 @@ logger = logging.getLogger(__name__)
 class SpeakRequest(BaseModel):
     text: str
 
+async def _iter_upload(file: UploadFile):
+    """Read an uploaded file in chunks, so it is streamed to Riva rather than held in memory."""
+    while chunk := await file.read(AUDIO_CHUNK_SIZE):
+        yield chunk
+
 @router.post("/speak")
 async def speak(request: SpeakRequest, user = Depends(get_current_user)):
     """Convert text to speech using NVIDIA Riva."""
-    audio_content = await riva_agent.text_to_speech(request.text)
-    if not audio_content:
+    audio_stream = await riva_agent.text_to_speech(request.text)
+    if audio_stream is None:
         # Fallback indicated to client
         raise HTTPException(status_code=501, detail="NVIDIA RIVA TTS not available")
     
-    return Response(content=audio_content, media_type="audio/wav")
+    # Audio is relayed as Riva produces it rather than buffered whole
+    return StreamingResponse(audio_stream, media_type="audio/wav")
 
 @router.post("/transcribe")
 async def transcribe(file: UploadFile = File(...), user = Depends(get_current_user)):
     """Convert speech to text using NVIDIA Riva."""
-    content = await file.read()
-    text = await riva_agent.speech_to_text(content)
+    # An empty upload goes through as b"" so it is rejected without calling Riva
+    audio = b"" if file.size == 0 else _iter_upload(file)
+    text = await riva_agent.speech_to_text(audio)
     if not text:
         raise HTTPException(status_code=500, detail="Transcription failed")
     
@@ -1,7 +1,7 @@
 """
 Pydantic Schemas for API Request/Response - MongoDB Version
 """
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, field_validator
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from enum import Enum
@@ -33,6 +33,16 @@ class UserResponse(BaseModel):
     
     class Config:
         from_attributes = True
+    
+    @field_validator("id", mode="before")
+    @classmethod
+    def _object_id_to_str(cls, v: Any) -> str:
+        return str(v)
+    
+    @field_validator("role", mode="before")
+    @classmethod
+    def _role_value(cls, v: Any) -> str:
+        return v.value if isinstance(v, Enum) else v
 
 class Token(BaseModel):
     access_token: str
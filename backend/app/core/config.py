@@ -30,6 +30,12 @@ class Settings(BaseSettings):
     NVIDIA_API_KEY: Optional[str] = None
     NVIDIA_LLM_MODEL: str = "meta/llama-3.1-70b-instruct"
     NVIDIA_EMBED_MODEL: str = "nvidia/nv-embedqa-e5-v5"
+    NVIDIA_MAX_CONCURRENCY: int = 5  # Max in-flight NIM requests per generation
+    AI_POOL_WORKERS: int = 2  # Worker processes for local SBERT grading and OCR, each holding its own model
+    GRADE_CACHE_SIZE: int = 4096  # Cached grading results kept in memory
+    # Min cosine similarity to reuse another answer's grade; None (default) grades every
+    # answer that is not an exact repeat, as near-identical embeddings can differ in meaning
+    GRADE_CACHE_SIMILARITY: Optional[float] = None
     RIVA_URL: str = "http://localhost:50051"
     
     class Config:
@@ -42,6 +48,7 @@ def get_settings() -> Settings:
 
 settings = get_settings()
 
-# Ensure directories exist
-os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
-os.makedirs("./data", exist_ok=True)
+def ensure_directories() -> None:
+    """Create the data and upload directories; called once at application startup."""
+    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+    os.makedirs("./data", exist_ok=True)
@@ -1,5 +1,6 @@
+import asyncio
 import os
-import PyPDF2
+import pypdfium2 as pdfium
 import docx
 import logging
 
@@ -21,23 +22,34 @@ def extract_text_from_file(file_path: str) -> str:
     logger.info(f"Extracted {len(text)} characters from {file_path}")
     return text
 
+async def extract_text_from_file_async(file_path: str) -> str:
+    """Extract text in a worker thread, so parsing a large document does not block the event loop."""
+    return await asyncio.to_thread(extract_text_from_file, file_path)
+
 def extract_text_from_pdf(file_path: str) -> str:
-    text = ""
-    with open(file_path, "rb") as file:
-        try:
-            reader = PyPDF2.PdfReader(file)
-            for page in reader.pages:
-                try:
-                    extracted = page.extract_text()
-                    if extracted:
-                        text += extracted.strip() + "\n"
-                except Exception as e:
-                    logger.warning(f"Failed to extract text from a page in {file_path}: {e}")
-                    continue
-        except Exception as e:
-            logger.error(f"Failed to read PDF {file_path}: {e}")
-            raise ValueError(f"Could not read PDF file: {str(e)}")
-    return text.strip()
+    # PDFium (C) extracts one page at a time, much faster than a pure-Python parser
+    parts = []
+    try:
+        pdf = pdfium.PdfDocument(file_path)
+    except Exception as e:
+        logger.error(f"Failed to read PDF {file_path}: {e}")
+        raise ValueError(f"Could not read PDF file: {str(e)}")
+    try:
+        for page in pdf:
+            try:
+                textpage = page.get_textpage()
+                extracted = textpage.get_text_range()
+                textpage.close()
+                if extracted and extracted.strip():
+                    parts.append(extracted.strip())
+            except Exception as e:
+                logger.warning(f"Failed to extract text from a page in {file_path}: {e}")
+                continue
+            finally:
+                page.close()
+    finally:
+        pdf.close()
+    return "\n".join(parts)
 
 def extract_text_from_docx(file_path: str) -> str:
     doc = docx.Document(file_path)
@@ -1,8 +1,11 @@
 """
 MongoDB Database Connection using Motor and Beanie ODM
 """
+from typing import Any, Dict, Iterable
 from motor.motor_asyncio import AsyncIOMotorClient
 from beanie import init_beanie
+from pymongo import WriteConcern
+import asyncio
 import os
 from dotenv import load_dotenv
 
@@ -12,6 +15,20 @@ load_dotenv()
 MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
 DATABASE_NAME = os.getenv("DATABASE_NAME", "ai_assessment")
 
+# Connection pool: keep warm connections for bursts of exam traffic, recycle idle ones
+MONGODB_MAX_POOL_SIZE = int(os.getenv("MONGODB_MAX_POOL_SIZE", "100"))
+MONGODB_MIN_POOL_SIZE = int(os.getenv("MONGODB_MIN_POOL_SIZE", "10"))
+MONGODB_MAX_IDLE_MS = int(os.getenv("MONGODB_MAX_IDLE_MS", "1800000"))
+# Fail fast when no server is reachable instead of queueing requests for the 30s driver default
+MONGODB_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+# Wire compression; zlib ships with Python, zstd/snappy need their optional packages
+MONGODB_COMPRESSORS = os.getenv("MONGODB_COMPRESSORS", "zlib")
+
+# Documents per insert_many call in bulk loads
+BULK_INSERT_BATCH_SIZE = 10_000
+# insert_many calls a bulk load keeps in flight; more only thrashes the server's cache
+BULK_INSERT_CONCURRENCY = int(os.getenv("BULK_INSERT_CONCURRENCY", "8"))
+
 # Global client instance
 client: AsyncIOMotorClient = None
 
@@ -23,7 +40,15 @@ async def connect_db():
     # Import models here to avoid circular imports
     from app.db.models import User, Exam, Question, Submission, Answer, LoginRecord
     
-    client = AsyncIOMotorClient(MONGODB_URL)
+    client = AsyncIOMotorClient(
+        MONGODB_URL,
+        maxPoolSize=MONGODB_MAX_POOL_SIZE,
+        minPoolSize=MONGODB_MIN_POOL_SIZE,
+        maxIdleTimeMS=MONGODB_MAX_IDLE_MS,
+        serverSelectionTimeoutMS=MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+        compressors=MONGODB_COMPRESSORS,
+        retryWrites=True
+    )
     
     await init_beanie(
         database=client[DATABASE_NAME],
@@ -44,3 +69,39 @@ async def close_db():
 async def get_database():
     """Get database instance."""
     return client[DATABASE_NAME]
+
+
+async def bulk_insert(collection: str, documents: Iterable[Dict[str, Any]], batch_size: int = BULK_INSERT_BATCH_SIZE) -> None:
+    """
+    Fire-and-forget bulk load for backfills and synthetic data.
+    
+    Writes are unacknowledged (w=0) and unordered, so nothing waits on the server
+    and failed documents are silently dropped; never use this for user data.
+    
+    Args:
+        collection: Target collection name
+        documents: Raw documents to insert
+        batch_size: Documents per insert_many call
+    """
+    coll = client[DATABASE_NAME][collection].with_options(write_concern=WriteConcern(w=0))
+    # Batches overlap, but no more than BULK_INSERT_CONCURRENCY at a time
+    semaphore = asyncio.Semaphore(BULK_INSERT_CONCURRENCY)
+    pending = set()
+    
+    async def insert(batch: list) -> None:
+        try:
+            await coll.insert_many(batch, ordered=False)
+        finally:
+            semaphore.release()
+    
+    batch = []
+    for document in documents:
+        batch.append(document)
+        if len(batch) >= batch_size:
+            await semaphore.acquire()
+            pending.add(asyncio.create_task(insert(batch)))
+            batch = []
+    if batch:
+        await semaphore.acquire()
+        pending.add(asyncio.create_task(insert(batch)))
+    await asyncio.gather(*pending)
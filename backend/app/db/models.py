@@ -1,8 +1,9 @@
 """
 MongoDB Document Models using Beanie ODM
 """
-from beanie import Document, PydanticObjectId
-from pydantic import Field, EmailStr
+from beanie import Document, Indexed, PydanticObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pydantic import BaseModel, Field, EmailStr
 from typing import Optional, Dict, List, Any
 from datetime import datetime
 from enum import Enum
@@ -22,8 +23,8 @@ class ExamMode(str, Enum):
 
 class User(Document):
     """User document model."""
-    username: str = Field(..., unique=True, index=True)
-    email: EmailStr = Field(..., unique=True, index=True)
+    username: Indexed(str, unique=True)
+    email: Indexed(EmailStr, unique=True)
     password_hash: str
     full_name: str
     role: UserRole = UserRole.STUDENT
@@ -45,6 +46,8 @@ class Question(Document):
     options: Optional[Dict[str, str]] = None
     correct_answer: Optional[str] = None
     model_answer: Optional[str] = None
+    # Normalised float32 SBERT embedding of model_answer, so grading encodes only the student answer
+    model_answer_embedding: Optional[bytes] = None
     
     # NVIDIA AI Metadata
     concept_tags: List[str] = []
@@ -53,6 +56,20 @@ class Question(Document):
     
     class Settings:
         name = "questions"
+        indexes = [
+            # An exam's questions in sequential (_id) order
+            IndexModel([("exam_id", ASCENDING), ("_id", ASCENDING)])
+        ]
+
+
+class QuestionSlim(BaseModel):
+    """Projection of the Question fields served to students during a sitting."""
+    id: PydanticObjectId = Field(alias="_id")
+    question_text: str
+    question_type: str = "mcq"
+    difficulty: float = 0.5
+    points: float = 1.0
+    options: Optional[Dict[str, str]] = None
 
 
 class Exam(Document):
@@ -72,6 +89,10 @@ class Exam(Document):
     
     class Settings:
         name = "exams"
+        indexes = [
+            IndexModel([("is_active", ASCENDING)]),
+            IndexModel([("created_by", ASCENDING)])
+        ]
 
 
 class Answer(Document):
@@ -92,6 +113,16 @@ class Answer(Document):
     
     class Settings:
         name = "answers"
+        indexes = [
+            # Answers per submission, and the distinct question ids answered in it
+            IndexModel([("submission_id", ASCENDING), ("question_id", ASCENDING)])
+        ]
+
+
+class AnswerScore(BaseModel):
+    """Projection of the Answer fields needed to total a submission."""
+    score: float = 0.0
+    is_correct: bool = False
 
 
 class Submission(Document):
@@ -100,6 +131,8 @@ class Submission(Document):
     exam_id: PydanticObjectId
     status: str = "in_progress"
     current_ability: float = 0.5
+    # Ids of answered questions; None for sessions started before this was tracked
+    answered_question_ids: Optional[List[str]] = None
     total_score: float = 0.0
     max_score: float = 0.0
     percentage: float = 0.0
@@ -110,6 +143,34 @@ class Submission(Document):
     
     class Settings:
         name = "submissions"
+        indexes = [
+            # Teacher dashboard: graded submissions per exam, newest first
+            IndexModel([("exam_id", ASCENDING), ("status", ASCENDING), ("submitted_at", DESCENDING)]),
+            # Resuming a sitting: a student's submission for an exam
+            IndexModel([("user_id", ASCENDING), ("exam_id", ASCENDING)]),
+            # A student's submission history, newest first
+            IndexModel([("user_id", ASCENDING), ("started_at", DESCENDING)])
+        ]
+
+
+class SubmissionSlim(BaseModel):
+    """Projection of the Submission fields used by analytics views."""
+    id: PydanticObjectId = Field(alias="_id")
+    user_id: PydanticObjectId
+    exam_id: PydanticObjectId
+    total_score: float = 0.0
+    percentage: float = 0.0
+    submitted_at: Optional[datetime] = None
+
+
+class UserSlim(BaseModel):
+    """Projection of the User fields returned by user listings (no password hash)."""
+    id: PydanticObjectId = Field(alias="_id")
+    username: str
+    email: str
+    full_name: Optional[str] = None
+    role: UserRole = UserRole.STUDENT
+    accessibility_mode: bool = False
 
 
 class LoginRecord(Document):
@@ -7,13 +7,15 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 
 from fastapi.staticfiles import StaticFiles
 import os
 
-from app.core.config import settings
+from app.core.config import settings, ensure_directories
 from app.db.database import connect_db, close_db
+from app.agents.nim_client import close_nim_client
+from app.agents.riva_agent import close_riva_client
 from app.api import auth, exams, analytics, riva
 
 # Configure logging
@@ -24,6 +26,7 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     """Application lifespan events."""
     logger.info("Starting AI Inclusive Assessment System...")
+    ensure_directories()
     
     # Connect to MongoDB
     await connect_db()
@@ -37,10 +40,22 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"AI models not loaded (using mock): {e}")
     
+    # Worker processes for CPU-bound local grading and OCR
+    close_ai_pool = None
+    try:
+        from app.services.ai_engine import start_ai_pool, close_ai_pool
+        start_ai_pool(settings.AI_POOL_WORKERS)
+    except ImportError as e:
+        logger.warning(f"AI worker pool not started (local model dependencies missing): {e}")
+    
     yield
     
     # Cleanup
+    if close_ai_pool is not None:
+        close_ai_pool()
     await close_db()
+    await close_nim_client()
+    await close_riva_client()
     logger.info("Shutting down...")
 
 # Create FastAPI app
@@ -49,7 +64,8 @@ app = FastAPI(
     description="AI-Driven Inclusive Assessment System with Adaptive Testing and Accessibility Features",
     version="1.0.0",
     lifespan=lifespan,
-    strict_slashes=False
+    strict_slashes=False,
+    default_response_class=ORJSONResponse  # orjson encodes responses and datetimes natively
 )
 
 # Exception handler for validation errors
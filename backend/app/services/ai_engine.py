@@ -1,88 +1,318 @@
+import asyncio
 import logging
+import platform
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 import random
-from typing import List, Dict, Any, Tuple
+from bisect import bisect_left
+from typing import List, Dict, Any, Optional, Sequence, Tuple, Union
 import numpy as np
 import cv2
 import pytesseract
-from sentence_transformers import SentenceTransformer, util
+from sentence_transformers import SentenceTransformer
+
+try:
+    # PP-OCR detection + recognition as in-process ONNX Runtime sessions
+    from rapidocr_onnxruntime import RapidOCR
+except ImportError:
+    RapidOCR = None
+
+from app.agents.question_pool import QuestionPool
 
 # Configuration
 # Point this to your tesseract executable if on Windows, e.g., r"C:\Program Files\Tesseract-OCR\tesseract.exe"
 # pytesseract.pytesseract.tesseract_cmd = 'tesseract'
 
+SBERT_MODEL = 'all-MiniLM-L6-v2'
+
+# Similarity bands: a similarity strictly above each threshold moves up one band
+SIMILARITY_THRESHOLDS = (0.30, 0.50, 0.70, 0.85)
+SIMILARITY_SCORES = (0, 30, 60, 85, 100)
+SIMILARITY_FEEDBACK = (
+    "Irrelevant answer.",
+    "Weak answer. Related but not accurate.",
+    "Partially correct. Key concepts might be missing.",
+    "Good semantic match.",
+    "Excellent! Meaning matches perfectly."
+)
+
+def _similarity_result(similarity: float) -> Dict[str, Any]:
+    """Score and feedback for a student/reference cosine similarity."""
+    # Apply a sigmoid-like curve or thresholding to convert raw similarity to score
+    band = bisect_left(SIMILARITY_THRESHOLDS, similarity)
+    return {
+        "score": SIMILARITY_SCORES[band],
+        "raw_similarity": round(similarity, 4),
+        "feedback": SIMILARITY_FEEDBACK[band]
+    }
+
+def _normalise_text(text: str) -> str:
+    """Lower-case text with runs of whitespace collapsed, for verbatim comparison."""
+    return " ".join(text.lower().split())
+
+def _similarity_results(similarities: np.ndarray) -> List[Dict[str, Any]]:
+    """_similarity_result for a whole vector of similarities, banded in one searchsorted."""
+    bands = np.searchsorted(SIMILARITY_THRESHOLDS, similarities, side='left')
+    return [
+        {
+            "score": SIMILARITY_SCORES[band],
+            "raw_similarity": round(similarity, 4),
+            "feedback": SIMILARITY_FEEDBACK[band]
+        }
+        for similarity, band in zip(similarities.tolist(), bands.tolist())
+    ]
+
+@lru_cache(maxsize=1)
+def _cpu_flags() -> str:
+    """Raw /proc/cpuinfo text, empty where it is unavailable (non-Linux hosts)."""
+    try:
+        with open("/proc/cpuinfo") as f:
+            return f.read()
+    except OSError:
+        return ""
+
+def _quantized_onnx_file() -> str:
+    """Int8 ONNX export of the SBERT model built for this CPU's int8 dot-product instructions."""
+    if platform.machine().lower() in ("arm64", "aarch64"):
+        return "onnx/model_qint8_arm64.onnx"
+    if "avx512_vnni" in _cpu_flags():
+        return "onnx/model_qint8_avx512_vnni.onnx"
+    return "onnx/model_quint8_avx2.onnx"
+
+@lru_cache(maxsize=1)
+def _cuda_available() -> bool:
+    """Whether PyTorch can see a CUDA GPU."""
+    try:
+        import torch
+    except ImportError:
+        return False
+    return torch.cuda.is_available()
+
+def _torch_model_kwargs() -> Dict[str, Any]:
+    """Weights dtype for the PyTorch fallback: bfloat16 where the CPU has native bf16 math."""
+    flags = _cpu_flags()
+    if "avx512_bf16" in flags or "amx_bf16" in flags:
+        return {"torch_dtype": "bfloat16"}
+    return {}
+
+# Longest side, in pixels, that scans are downscaled to before OCR
+OCR_MAX_DIMENSION = 2000
+
+# Abilities and difficulties live on a 0-1 scale while IRT works in logits: 0.5 maps to
+# 0 logits and one unit of the 0-1 scale spans ABILITY_LOGIT_SCALE logits
+ABILITY_LOGIT_SCALE = 6.0
+# Largest change to the ability one answer can cause, on the 0-1 scale
+MAX_ABILITY_STEP = 0.1
+# Adaptive exams can stop once the ability estimate's standard error (0-1 scale) drops
+# below this; roughly 20 items answered near the student's level
+ABILITY_SE_STOP = 0.075
+
+@lru_cache(maxsize=1)
+def get_sbert_model() -> SentenceTransformer:
+    """
+    Process-wide SBERT model, loaded on first use and shared by every AIEngine.
+    """
+    print("Loading AI Models... (This might take a moment)")
+    # Load SBERT model for semantic similarity
+    # 'all-MiniLM-L6-v2' is optimized for speed/performance on CPU
+    if _cuda_available():
+        # fp16 on the GPU beats any CPU backend by a wide margin
+        return SentenceTransformer(SBERT_MODEL, device="cuda", model_kwargs={"torch_dtype": "float16"})
+    try:
+        # Int8-quantised ONNX Runtime model, several times faster on CPU than FP32 PyTorch
+        return SentenceTransformer(
+            SBERT_MODEL,
+            backend="onnx",
+            model_kwargs={"file_name": _quantized_onnx_file()}
+        )
+    except Exception as e:
+        logging.warning(f"ONNX SBERT unavailable, using PyTorch: {e}")
+        # Half-width bf16 weights halve memory traffic on CPUs that compute in bf16
+        return SentenceTransformer(SBERT_MODEL, model_kwargs=_torch_model_kwargs())
+
+def _build_ocr() -> Optional["RapidOCR"]:
+    """In-process OCR engine, or None where RapidOCR is not installed (Tesseract is used then)."""
+    if RapidOCR is None:
+        return None
+    # CUDA execution needs onnxruntime-gpu; RapidOCR drops back to CPU without it
+    use_cuda = _cuda_available()
+    return RapidOCR(det_use_cuda=use_cuda, cls_use_cuda=use_cuda, rec_use_cuda=use_cuda)
+
 class AIEngine:
-    def __init__(self):
-        print("Loading AI Models... (This might take a moment)")
-        # Load SBERT model for semantic similarity
-        # 'all-MiniLM-L6-v2' is optimized for speed/performance on CPU
-        self.model = SentenceTransformer('all-MiniLM-L6-v2') 
+    def __init__(self, load_ocr: bool = True):
+        self.model = get_sbert_model()
+        # In-process OCR avoids a Tesseract subprocess and temp image file per call
+        self.ocr = _build_ocr() if load_ocr else None
         print("AI Models Loaded.")
 
-    def grade_descriptive_answer(self, student_answer: str, reference_answer: str) -> Dict[str, Any]:
+    def encode_reference(self, reference_answer: str) -> bytes:
+        """
+        Normalised float32 embedding of a reference answer, computed once and
+        stored on its Question as model_answer_embedding.
+        """
+        embedding = self.model.encode(reference_answer, normalize_embeddings=True)
+        return np.asarray(embedding, dtype=np.float32).tobytes()
+
+    def encode_references(self, reference_answers: List[str]) -> List[bytes]:
+        """encode_reference for many reference answers in one batched encode."""
+        embeddings = self.model.encode(reference_answers, normalize_embeddings=True)
+        return [row.tobytes() for row in np.asarray(embeddings, dtype=np.float32)]
+
+    def grade_descriptive_answer(
+        self,
+        student_answer: str,
+        reference_answer: str,
+        reference_embedding: Optional[bytes] = None
+    ) -> Dict[str, Any]:
         """
         Grades a descriptive answer by comparing semantic similarity 
         with the reference answer using SBERT.
+        A stored reference_embedding (see encode_reference) skips re-encoding the reference.
         """
         if not student_answer or not student_answer.strip():
             return {"score": 0, "feedback": "No answer provided.", "similarity": 0.0}
 
-        # Compute embeddings
-        embeddings1 = self.model.encode(student_answer, convert_to_tensor=True)
-        embeddings2 = self.model.encode(reference_answer, convert_to_tensor=True)
-
-        # Compute cosine similarity
-        cosine_scores = util.cos_sim(embeddings1, embeddings2)
-        similarity = float(cosine_scores[0][0])
-
-        # Grading logic
-        # Apply a sigmoid-like curve or thresholding to convert raw similarity to score
-        score_percent = 0
-        feedback = "Needs Improvement"
-
-        if similarity > 0.85:
-            score_percent = 100
-            feedback = "Excellent! Meaning matches perfectly."
-        elif similarity > 0.70:
-            score_percent = 85
-            feedback = "Good semantic match."
-        elif similarity > 0.50:
-            score_percent = 60
-            feedback = "Partially correct. Key concepts might be missing."
-        elif similarity > 0.30:
-            score_percent = 30
-            feedback = "Weak answer. Related but not accurate."
+        # A verbatim copy of the reference needs no transformer pass
+        if _normalise_text(student_answer) == _normalise_text(reference_answer or ""):
+            return _similarity_result(1.0)
+
+        if reference_embedding is not None:
+            student = self.model.encode(student_answer, normalize_embeddings=True)
+            reference = np.frombuffer(reference_embedding, dtype=np.float32)
+            return _similarity_result(float(np.dot(student, reference)))
+
+        # Encode both texts in one batch; normalised rows make cosine a dot product
+        embeddings = self.model.encode(
+            [student_answer, reference_answer],
+            batch_size=2,
+            convert_to_tensor=True,
+            normalize_embeddings=True
+        )
+        similarity = float((embeddings[0] * embeddings[1]).sum())
+
+        return _similarity_result(similarity)
+
+    def grade_batch(
+        self,
+        student_answers: List[str],
+        reference_answer: str,
+        reference_embedding: Optional[bytes] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Grades many answers to the same question against one reference answer.
+        The reference (unless its stored embedding is given) and all non-empty
+        answers are encoded in a single batched call.
+        """
+        results: List[Dict[str, Any]] = [
+            {"score": 0, "feedback": "No answer provided.", "similarity": 0.0}
+            for _ in student_answers
+        ]
+        reference = _normalise_text(reference_answer or "")
+        answered = []
+        for i, a in enumerate(student_answers):
+            if not a or not a.strip():
+                continue
+            if _normalise_text(a) == reference:
+                # Verbatim copies of the reference skip the encode
+                results[i] = _similarity_result(1.0)
+            else:
+                answered.append(i)
+        if not answered:
+            return results
+
+        # encode() groups inputs of similar length into padded batches itself
+        if reference_embedding is not None:
+            embeddings = self.model.encode(
+                [student_answers[i] for i in answered],
+                normalize_embeddings=True
+            )
+            similarities = embeddings @ np.frombuffer(reference_embedding, dtype=np.float32)
         else:
-            score_percent = 0
-            feedback = "Irrelevant answer."
+            embeddings = self.model.encode(
+                [reference_answer] + [student_answers[i] for i in answered],
+                normalize_embeddings=True
+            )
+            similarities = embeddings[1:] @ embeddings[0]
+        for i, result in zip(answered, _similarity_results(similarities)):
+            results[i] = result
+        return results
 
-        return {
-            "score": score_percent,
-            "raw_similarity": round(similarity, 4),
-            "feedback": feedback
-        }
+    def grade_exam(
+        self,
+        student_answers: List[str],
+        reference_answers: List[str],
+        reference_embeddings: Optional[Sequence[Optional[bytes]]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Grades one answer per descriptive question of an exam, pairing
+        student_answers[i] with reference_answers[i].
+        With every stored reference embedding given, only the student answers are
+        encoded; otherwise references and answers share one batched encode.
+        """
+        results: List[Dict[str, Any]] = [
+            {"score": 0, "feedback": "No answer provided.", "similarity": 0.0}
+            for _ in student_answers
+        ]
+        answered = []
+        for i, a in enumerate(student_answers):
+            if not a or not a.strip():
+                continue
+            if _normalise_text(a) == _normalise_text(reference_answers[i] or ""):
+                # Verbatim copies of the reference skip the encode
+                results[i] = _similarity_result(1.0)
+            else:
+                answered.append(i)
+        if not answered:
+            return results
+
+        texts = [student_answers[i] for i in answered]
+        if reference_embeddings is not None and all(reference_embeddings[i] is not None for i in answered):
+            students = self.model.encode(texts, batch_size=len(texts), normalize_embeddings=True)
+            # Stored embeddings stack into one (K, dim) float32 matrix
+            references = np.frombuffer(
+                b"".join(reference_embeddings[i] for i in answered), dtype=np.float32
+            ).reshape(len(answered), -1)
+        else:
+            embeddings = self.model.encode(
+                texts + [reference_answers[i] for i in answered],
+                normalize_embeddings=True
+            )
+            students, references = embeddings[:len(texts)], embeddings[len(texts):]
+
+        # Row-wise dot products of normalised rows: every cosine similarity in one pass
+        similarities = np.einsum('ij,ij->i', students, references)
+        for i, result in zip(answered, _similarity_results(similarities)):
+            results[i] = result
+        return results
 
     def process_handwritten_image(self, image_path: str) -> str:
         """
         Uses OpenCV to preprocess and Tesseract to extract text from a handwritten image.
         """
         try:
-            # 1. Read Image
-            img = cv2.imread(image_path)
-            if img is None:
+            # 1. Read Image, decoded straight to grayscale (no separate colour conversion pass)
+            gray = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+            if gray is None:
                 raise ValueError("Image not found")
 
             # 2. Preprocessing
-            # Convert to grayscale
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            
-            # Remove noise using Gaussian Blur
-            blur = cv2.GaussianBlur(gray, (5, 5), 0)
+            # Downscale very large scans; Tesseract time grows with pixel count
+            height, width = gray.shape
+            scale = OCR_MAX_DIMENSION / max(height, width)
+            if scale < 1:
+                gray = cv2.resize(gray, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
             
-            # Adaptive Thresholding to behave like a scanner (binarization)
-            thresh = cv2.adaptiveThreshold(blur, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
+            # Adaptive Thresholding to behave like a scanner (binarization); its Gaussian
+            # neighbourhood weighting already smooths noise, so no separate blur pass
+            thresh = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
                                            cv2.THRESH_BINARY, 11, 2)
             
             # 3. OCR Extraction
+            if self.ocr is not None:
+                # Detected lines come back in reading order; all crops are recognised in one batch
+                lines, _ = self.ocr(thresh)
+                return "\n".join(text for _, text, _ in lines or []).strip()
+            
             # custom_config = r'--oem 3 --psm 6' # Default config
             text = pytesseract.image_to_string(thresh, lang='eng')
             
@@ -91,51 +321,141 @@ class AIEngine:
             logging.error(f"OCR Failed: {e}")
             return ""
 
+# The engine inside a pool worker process, built once by the pool initializer
+_worker_engine: Optional[AIEngine] = None
+
+def _init_worker() -> None:
+    # Only SBERT is preloaded; OCR is built on a worker's first OCR job
+    global _worker_engine
+    _worker_engine = AIEngine(load_ocr=False)
+
+def _grade_in_worker(student_answer: str, reference_answer: str, reference_embedding: Optional[bytes]) -> Dict[str, Any]:
+    return _worker_engine.grade_descriptive_answer(student_answer, reference_answer, reference_embedding)
+
+def _ocr_in_worker(image_path: str) -> str:
+    if _worker_engine.ocr is None:
+        _worker_engine.ocr = _build_ocr()
+    return _worker_engine.process_handwritten_image(image_path)
+
+# Worker pool used by the async helpers below, owned by the application lifespan
+_ai_pool: Optional[ProcessPoolExecutor] = None
+
+def start_ai_pool(max_workers: int) -> None:
+    """Create the worker pool on application startup; workers are spawned as work arrives."""
+    global _ai_pool
+    _ai_pool = ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker)
+
+def close_ai_pool() -> None:
+    """Shut the worker pool down on application shutdown, dropping queued jobs."""
+    global _ai_pool
+    if _ai_pool is not None:
+        _ai_pool.shutdown(cancel_futures=True)
+        _ai_pool = None
+
+def _get_ai_pool() -> ProcessPoolExecutor:
+    if _ai_pool is None:
+        raise RuntimeError("AI worker pool is not running; call start_ai_pool() first")
+    return _ai_pool
+
+async def grade_descriptive_answer_async(
+    student_answer: str,
+    reference_answer: str,
+    reference_embedding: Optional[bytes] = None
+) -> Dict[str, Any]:
+    """AIEngine.grade_descriptive_answer in a pool worker, keeping the event loop free."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_ai_pool(), _grade_in_worker, student_answer, reference_answer, reference_embedding
+    )
+
+async def process_handwritten_image_async(image_path: str) -> str:
+    """AIEngine.process_handwritten_image in a pool worker, keeping the event loop free."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_ai_pool(), _ocr_in_worker, image_path)
+
 class AdaptiveExamEngine:
     def __init__(self):
         pass
 
     def get_next_question(self, 
                           current_student_ability: float, 
-                          available_questions: List[Dict]) -> Dict:
+                          available_questions: Union[QuestionPool, List[Dict]]) -> Optional[Dict]:
         """
         Selects the next question based on Item Response Theory (IRT) logic.
         We want a question whose difficulty is closest to the student's current ability.
         """
-        best_question = None
-        min_diff = float('inf')
+        pool = QuestionPool.coerce(available_questions)
+        if not len(pool):
+            return None
 
-        for question in available_questions:
-            diff = question.get('difficulty', 0.5)
-            # Find question with difficulty closest to student ability
-            distance = abs(diff - current_student_ability)
-            if distance < min_diff:
-                min_diff = distance
-                best_question = question
-        
-        return best_question
+        # The closest difficulty is a neighbour of the ability in the pool's sorted difficulties
+        diffs = pool.sorted_difficulty
+        order = pool.difficulty_order
+        i = bisect_left(diffs, current_student_ability)
+        candidates = []
+        if i < len(diffs):
+            candidates.append(i)
+        if i > 0:
+            # Start of the run of equal difficulties, i.e. the earliest such question in the pool
+            candidates.append(bisect_left(diffs, diffs[i - 1]))
+        # Closest difficulty wins; ties go to the question earlier in the pool
+        best = min(candidates, key=lambda j: (abs(diffs[j] - current_student_ability), order[j]))
+        return pool.questions[order[best]]
 
     def update_student_ability(self, 
                                current_ability: float, 
                                question_difficulty: float, 
-                               is_correct: bool) -> float:
+                               is_correct: bool,
+                               previous_responses: Sequence[Tuple[float, bool]] = ()) -> float:
         """
-        Updates the student's estimated ability based on their answer.
-        Simple heuristic update rule.
+        Updates the student's estimated ability based on their answers:
+        one Newton step of the 2PL IRT maximum-likelihood estimate over the
+        submission's previous (difficulty, is_correct) responses plus this one.
         """
-        learning_rate = 0.1
-        
-        if is_correct:
-            # If they got a hard question right, ability goes up significantly
-            # If they got an easy question right, ability goes up slightly
-            # We simplify this to just increasing ability.
-            new_ability = current_ability + learning_rate
-        else:
-            # If they got it wrong, capability estimate drops
-            new_ability = current_ability - learning_rate
+        ability, _ = self.estimate_ability(
+            current_ability, [*previous_responses, (question_difficulty, is_correct)]
+        )
+        return ability
+
+    def estimate_ability(self,
+                         current_ability: float,
+                         responses: Sequence[Tuple[float, bool]],
+                         discrimination: Optional[Sequence[float]] = None) -> Tuple[float, float]:
+        """
+        One Newton step of the 2PL IRT ability MLE, in logits:
+        theta += sum(a * (u - p)) / sum(a^2 * p * (1 - p)), with p = 1 / (1 + exp(-a * (theta - b))).
+        The step is capped at MAX_ABILITY_STEP, since a short history has a flat likelihood.
         
-        # Clamp between 0.0 and 1.0 (or whatever range we use)
-        return max(0.1, min(1.0, new_ability))
+        Returns:
+            The updated ability and its standard error, both on the 0-1 scale
+        """
+        if not responses:
+            # No answers carry no information about the ability
+            return current_ability, float("inf")
+
+        b = np.fromiter((d for d, _ in responses), dtype=np.float64, count=len(responses))
+        b = (b - 0.5) * ABILITY_LOGIT_SCALE
+        u = np.fromiter((c for _, c in responses), dtype=np.float64, count=len(responses))
+        a = np.ones_like(b) if discrimination is None else np.asarray(discrimination, dtype=np.float64)
+
+        theta = (current_ability - 0.5) * ABILITY_LOGIT_SCALE
+        p = 1.0 / (1.0 + np.exp(-a * (theta - b)))
+        information = float(np.sum(a * a * p * (1.0 - p)))
+        step = float(np.sum(a * (u - p))) / information / ABILITY_LOGIT_SCALE
+        step = max(-MAX_ABILITY_STEP, min(MAX_ABILITY_STEP, step))
+
+        # Clamp between 0.1 and 1.0 (or whatever range we use); all-right or
+        # all-wrong responses have no finite MLE
+        ability = max(0.1, min(1.0, current_ability + step))
+
+        theta = (ability - 0.5) * ABILITY_LOGIT_SCALE
+        p = 1.0 / (1.0 + np.exp(-a * (theta - b)))
+        standard_error = 1.0 / float(np.sqrt(np.sum(a * a * p * (1.0 - p)))) / ABILITY_LOGIT_SCALE
+        return ability, standard_error
+
+    def should_stop(self, standard_error: float) -> bool:
+        """Ends an adaptive exam once the ability estimate is precise enough."""
+        return standard_error < ABILITY_SE_STOP
 
 # Example usage block
 if __name__ == "__main__":
@@ -3,87 +3,139 @@ MongoDB Database Seeder
 Seeds the database with initial demo data
 """
 import asyncio
+import logging
 from datetime import datetime
+from functools import lru_cache
+import numpy as np
 from motor.motor_asyncio import AsyncIOMotorClient
-from beanie import init_beanie
-from passlib.context import CryptContext
+from beanie import PydanticObjectId, init_beanie
 import os
+from argon2 import PasswordHasher
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger("seeder")
+
 # Import models
 from app.db.models import User, Exam, Question, Submission, Answer, UserRole, LoginRecord
+from app.core.security import pwd_context
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# SBERT is optional here; without it questions are seeded without cached embeddings
+try:
+    from app.services.ai_engine import get_sbert_model
+except ImportError:
+    get_sbert_model = None
 
 # MongoDB connection
 MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
 DATABASE_NAME = os.getenv("DATABASE_NAME", "ai_assessment")
 
+# SEED_FAST=1 is for throwaway databases. It hashes passwords without a shipped hash
+# (see DEMO_PASSWORD_HASHES) at minimum Argon2 cost; login still verifies them and
+# rehashes each at full cost on first use. It also seeds with unacknowledged writes
+SEED_FAST = os.getenv("SEED_FAST", "0") == "1"
+
+# A database that already has the demo admin is left alone unless FORCE_RESEED=1
+FORCE_RESEED = os.getenv("FORCE_RESEED", "0") == "1"
+
+# Password hashing: the app's own Argon2 parameters, so seeded accounts are not rehashed
+# on first login, but through argon2-cffi directly rather than passlib's per-call dispatch
+_argon2 = pwd_context.handler("argon2")
+password_hasher = PasswordHasher(
+    time_cost=1 if SEED_FAST else _argon2.default_rounds,
+    memory_cost=1024 if SEED_FAST else _argon2.memory_cost,
+    parallelism=1 if SEED_FAST else _argon2.parallelism,
+    hash_len=_argon2.checksum_size,
+    salt_len=_argon2.default_salt_size
+)
+
+# The demo passwords are fixed, so their hashes are computed once and shipped; if the
+# app's Argon2 parameters change, login rehashes them on first use
+DEMO_PASSWORD_HASHES = {
+    "admin123": "$argon2id$v=19$m=65536,t=2,p=2$qvWUybB/XMpo763wIujo3A$N2h2TA+weCuXd6NcU3bpvYbFOnlAF4QHxPpPtoe6IGE",
+    "teacher123": "$argon2id$v=19$m=65536,t=2,p=2$nZhr9rVQoWvzGvBE7J0B7w$SMAPeSrA3KUKc/7uog/PCxg6G1K6v2tcxk4laXGiZ9o",
+    "student123": "$argon2id$v=19$m=65536,t=2,p=2$QWG9EwTcnlnwIZKU5aHhcw$+oOfn8BV7I1/WdKoFhuwWCELMucL8mqnRdEA9ZUtnwM",
+}
+
+# Memoised because fixtures reuse a handful of plaintexts across many users
+@lru_cache(maxsize=None)
+def hash_password(password: str) -> str:
+    """Shipped hash for a demo password, otherwise a fresh Argon2 hash."""
+    return DEMO_PASSWORD_HASHES.get(password) or password_hasher.hash(password)
+
 
 async def seed_database():
     """Seed the database with demo data."""
-    print("Connecting to MongoDB...")
+    logger.info("Connecting to MongoDB...")
     
-    client = AsyncIOMotorClient(MONGODB_URL)
+    # Unacknowledged (w=0) fast seeding uses a single connection: the server applies its
+    # writes in the order sent, so the drop lands before inserts and a closing ping waits for all
+    client = AsyncIOMotorClient(MONGODB_URL, w=0, maxPoolSize=1) if SEED_FAST else AsyncIOMotorClient(MONGODB_URL)
     
+    database = client[DATABASE_NAME]
+    
+    # One indexed lookup (username is unique) instead of clearing and rebuilding the same data
+    if not FORCE_RESEED and await database[User.Settings.name].find_one({"username": "admin"}, {"_id": 1}):
+        logger.info("Database already seeded; set FORCE_RESEED=1 to rebuild it.")
+        client.close()
+        return
+    
+    logger.info("Connected! Clearing existing data...")
+    
+    # Dropping the database is one metadata operation, where per-collection deletes scan
+    # every document; init_beanie then recreates the indexes on the empty collections
+    await client.drop_database(DATABASE_NAME)
     await init_beanie(
-        database=client[DATABASE_NAME],
+        database=database,
         document_models=[User, Exam, Question, Submission, Answer, LoginRecord]
     )
     
-    print("Connected! Clearing existing data...")
+    logger.info("Creating users...")
     
-    # Clear existing data
-    await User.delete_all()
-    await Exam.delete_all()
-    await Question.delete_all()
-    await Submission.delete_all()
-    await Answer.delete_all()
-    await LoginRecord.delete_all()
-    
-    print("Creating users...")
+    admin_hash = hash_password("admin123")
+    teacher_hash = hash_password("teacher123")
+    student_hash = hash_password("student123")
     
     # Create Admin
     admin = User(
+        id=PydanticObjectId(),
         username="admin",
         email="admin@example.com",
-        password_hash=pwd_context.hash("admin123"),
+        password_hash=admin_hash,
         full_name="System Admin",
         role=UserRole.ADMIN,
         is_active=True
     )
-    await admin.insert()
     
     # Create Teacher
     teacher = User(
+        id=PydanticObjectId(),
         username="teacher",
         email="teacher@example.com",
-        password_hash=pwd_context.hash("teacher123"),
+        password_hash=teacher_hash,
         full_name="Demo Teacher",
         role=UserRole.TEACHER,
         is_active=True
     )
-    await teacher.insert()
     
     # Create Student
     student = User(
+        id=PydanticObjectId(),
         username="student",
         email="student@example.com",
-        password_hash=pwd_context.hash("student123"),
+        password_hash=student_hash,
         full_name="Demo Student",
         role=UserRole.STUDENT,
         is_active=True,
         accessibility_mode=True
     )
-    await student.insert()
     
-    print("Creating sample exam...")
+    logger.info("Creating sample exam...")
     
     # Create Exam
     exam = Exam(
+        id=PydanticObjectId(),
         title="Introduction to Computer Science",
         description="Basic concepts in computer science and programming",
         created_by=teacher.id,
@@ -94,83 +146,85 @@ async def seed_database():
         total_marks=100.0,
         passing_score=50.0
     )
-    await exam.insert()
     
-    print("Creating questions...")
+    logger.info("Creating questions...")
     
-    # Create MCQ Questions
-    questions_data = [
-        {
-            "question_text": "What does CPU stand for?",
-            "question_type": "mcq",
-            "difficulty": 0.2,
-            "points": 1.0,
-            "options": {
-                "A": "Central Processing Unit",
-                "B": "Computer Personal Unit",
-                "C": "Central Program Utility",
-                "D": "Computer Processing Unit"
-            },
-            "correct_answer": "A"
-        },
+    # Create MCQ and descriptive questions: one column per field, row i across
+    # the columns being question i
+    question_texts = [
+        "What does CPU stand for?",
+        "Which of the following is a programming language?",
+        "What is the binary representation of decimal 10?",
+        "What is an algorithm?",
+        "Explain the concept of a variable in programming."
+    ]
+    question_types = ["mcq", "mcq", "mcq", "descriptive", "descriptive"]
+    difficulties = [0.2, 0.3, 0.5, 0.4, 0.6]
+    points = [1.0, 1.0, 1.0, 2.0, 2.0]
+    options = [
         {
-            "question_text": "Which of the following is a programming language?",
-            "question_type": "mcq",
-            "difficulty": 0.3,
-            "points": 1.0,
-            "options": {
-                "A": "HTML",
-                "B": "Python",
-                "C": "CSS",
-                "D": "SQL"
-            },
-            "correct_answer": "B"
+            "A": "Central Processing Unit",
+            "B": "Computer Personal Unit",
+            "C": "Central Program Utility",
+            "D": "Computer Processing Unit"
         },
         {
-            "question_text": "What is the binary representation of decimal 10?",
-            "question_type": "mcq",
-            "difficulty": 0.5,
-            "points": 1.0,
-            "options": {
-                "A": "1010",
-                "B": "1100",
-                "C": "1001",
-                "D": "1110"
-            },
-            "correct_answer": "A"
+            "A": "HTML",
+            "B": "Python",
+            "C": "CSS",
+            "D": "SQL"
         },
         {
-            "question_text": "What is an algorithm?",
-            "question_type": "descriptive",
-            "difficulty": 0.4,
-            "points": 2.0,
-            "model_answer": "An algorithm is a step-by-step procedure or formula for solving a problem. It is a sequence of instructions that defines how to perform a task or reach a solution."
+            "A": "1010",
+            "B": "1100",
+            "C": "1001",
+            "D": "1110"
         },
-        {
-            "question_text": "Explain the concept of a variable in programming.",
-            "question_type": "descriptive",
-            "difficulty": 0.6,
-            "points": 2.0,
-            "model_answer": "A variable is a named storage location in computer memory that holds a value. Variables can store different types of data such as numbers, text, or boolean values, and their contents can be changed during program execution."
-        }
+        None,
+        None
+    ]
+    correct_answers = ["A", "B", "A", None, None]
+    model_answers = [
+        None,
+        None,
+        None,
+        "An algorithm is a step-by-step procedure or formula for solving a problem. It is a sequence of instructions that defines how to perform a task or reach a solution.",
+        "A variable is a named storage location in computer memory that holds a value. Variables can store different types of data such as numbers, text, or boolean values, and their contents can be changed during program execution."
     ]
     
-    for q_data in questions_data:
-        question = Question(
+    # Reference embeddings for every descriptive question come from one batched encode;
+    # only the SBERT model is loaded, and seeding goes on without embeddings if it fails
+    references = [m for m in model_answers if m]
+    embeddings = {}
+    if get_sbert_model is not None and references:
+        try:
+            vectors = get_sbert_model().encode(references, normalize_embeddings=True)
+            embeddings = dict(zip(references, (row.tobytes() for row in np.asarray(vectors, dtype=np.float32))))
+        except Exception as e:
+            logger.warning("SBERT unavailable, seeding questions without cached embeddings: %s", e)
+    
+    # The fixture data is already well-typed, so validation is skipped; defaults still apply
+    questions = [
+        Question.model_construct(
             exam_id=exam.id,
-            question_text=q_data["question_text"],
-            question_type=q_data["question_type"],
-            difficulty=q_data["difficulty"],
-            points=q_data["points"],
-            options=q_data.get("options"),
-            correct_answer=q_data.get("correct_answer"),
-            model_answer=q_data.get("model_answer")
+            question_text=text,
+            question_type=question_type,
+            difficulty=difficulty,
+            points=point,
+            options=option,
+            correct_answer=correct_answer,
+            model_answer=model_answer,
+            model_answer_embedding=embeddings.get(model_answer)
+        )
+        for text, question_type, difficulty, point, option, correct_answer, model_answer in zip(
+            question_texts, question_types, difficulties, points, options, correct_answers, model_answers
         )
-        await question.insert()
+    ]
     
-    print("Creating sample submission...")
+    logger.info("Creating sample submission...")
     
     # Create a sample graded submission for history
+    now = datetime.now()
     submission = Submission(
         user_id=student.id,
         exam_id=exam.id,
@@ -179,24 +233,41 @@ async def seed_database():
         total_score=8.0,
         max_score=10.0,
         percentage=80.0,
-        started_at=datetime.now(),
-        submitted_at=datetime.now()
+        started_at=now,
+        submitted_at=now
+    )
+    
+    # Ids are assigned client-side, so nothing waits on an earlier insert: every
+    # collection is written concurrently, each with one unordered bulk write
+    await asyncio.gather(
+        User.insert_many([admin, teacher, student], ordered=False),
+        exam.insert(),
+        Question.insert_many(questions, ordered=False),
+        submission.insert()
+    )
+    
+    if SEED_FAST:
+        await client.admin.command("ping")
+    
+    banner = "=" * 50
+    logger.info(
+        "\n%s\n[OK] Database seeded successfully!\n%s\n"
+        "\nTest Accounts Created:\n"
+        "  - admin / admin123 (Admin)\n"
+        "  - teacher / teacher123 (Teacher)\n"
+        "  - student / student123 (Student with accessibility mode)\n"
+        "\nSample Exam: %s\nTotal Questions: %d\n%s",
+        banner, banner, exam.title, len(questions), banner
     )
-    await submission.insert()
-    
-    print("\n" + "="*50)
-    print("[OK] Database seeded successfully!")
-    print("="*50)
-    print("\nTest Accounts Created:")
-    print("  - admin / admin123 (Admin)")
-    print("  - teacher / teacher123 (Teacher)")
-    print("  - student / student123 (Student with accessibility mode)")
-    print(f"\nSample Exam: {exam.title}")
-    print(f"Total Questions: {len(questions_data)}")
-    print("="*50)
     
     client.close()
 
 
 if __name__ == "__main__":
-    asyncio.run(seed_database())
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    # uvloop (installed with uvicorn[standard]) runs Motor's many small awaits faster
+    try:
+        from uvloop import run
+    except ImportError:
+        from asyncio import run
+    run(seed_database())
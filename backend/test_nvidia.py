@@ -1,3 +1,5 @@
+import httpx
+from functools import lru_cache
 from openai import OpenAI
 import os
 from dotenv import load_dotenv
@@ -8,19 +10,29 @@ load_dotenv(dotenv_path)
 
 api_key = os.getenv("NVIDIA_API_KEY")
 
-if not api_key or api_key == "your_nvidia_api_key_here":
-    print("ERROR: NVIDIA_API_KEY is not set or is still the placeholder in .env")
-else:
-    print(f"DEBUG: Found API Key (starts with): {api_key[:10]}...")
-    
-    client = OpenAI(
+
+@lru_cache(maxsize=1)
+def get_client() -> OpenAI:
+    """One client per process, so repeat checks reuse its warm HTTP/2 connection."""
+    # Same HTTP/2 keep-alive transport as the app's NIM client
+    return OpenAI(
         base_url="https://integrate.api.nvidia.com/v1",
-        api_key=api_key
+        api_key=api_key,
+        http_client=httpx.Client(http2=True, limits=httpx.Limits(keepalive_expiry=30))
     )
 
+
+def check_connection():
+    """Send one short chat completion to NVIDIA NIM and report the outcome."""
+    if not api_key or api_key == "your_nvidia_api_key_here":
+        print("ERROR: NVIDIA_API_KEY is not set or is still the placeholder in .env")
+        return
+    
+    print(f"DEBUG: Found API Key (starts with): {api_key[:10]}...")
+    
     try:
         print("Testing connection to NVIDIA NIM...")
-        completion = client.chat.completions.create(
+        completion = get_client().chat.completions.create(
             model="meta/llama-3.1-70b-instruct",
             messages=[{"role":"user","content":"Hello, are you working?"}],
             temperature=0.2,
@@ -31,3 +43,7 @@ else:
         print(f"Response: {completion.choices[0].message.content}")
     except Exception as e:
         print(f"FAILED: NVIDIA NIM Error: {e}")
+
+
+if __name__ == "__main__":
+    check_connection()
@@ -155,6 +155,7 @@ export interface TeacherDashboard {
         percentage: number;
         submitted_at: string | null;
     }>;
+    average_percentage?: number | null;
     login_activity?: Array<{ timestamp: string }>;
     submission_activity?: Array<{ timestamp: string }>;
 }
@@ -272,10 +273,19 @@ export const authApi = {
         return !!localStorage.getItem('accessToken');
     },
 
-    // Admin only
+    // Admin only; the endpoint is paginated, so pages are fetched until a short one arrives
     listUsers: async (): Promise<User[]> => {
-        const response = await apiClient.get<User[]>('/auth/users');
-        return response.data;
+        const pageSize = 500;
+        const users: User[] = [];
+        for (let offset = 0; ; offset += pageSize) {
+            const response = await apiClient.get<User[]>('/auth/users', {
+                params: { limit: pageSize, offset },
+            });
+            users.push(...response.data);
+            if (response.data.length < pageSize) {
+                return users;
+            }
+        }
     },
 
     updateUserRole: async (userId: string, newRole: string): Promise<User> => {
@@ -80,8 +80,8 @@ const TeacherDashboard = () => {
         { title: "Total Submissions", value: String(dashboard?.total_submissions || 0), change: "+12%", icon: Activity, color: "text-accent" },
         { title: "Active Exams", value: String(dashboard?.exams?.filter(e => e.is_active)?.length ?? 0), change: "+1", icon: Users, color: "text-success" },
         {
-            title: "Avg. Score", value: (dashboard?.student_submissions && dashboard.student_submissions.length > 0) ?
-                `${(dashboard.student_submissions.reduce((a, b) => a + (b.percentage || 0), 0) / dashboard.student_submissions.length).toFixed(0)}%` : "N/A",
+            title: "Avg. Score", value: dashboard?.average_percentage != null ?
+                `${dashboard.average_percentage.toFixed(0)}%` : "N/A",
             change: "+8%", icon: TrendingUp, color: "text-warning"
         },
     ];